@@ -2,37 +2,62 @@ import json
 import zlib
 import base64
 import os
+import re
+import zipfile
 
-def compress_encode(data: bytes) -> str:
-    """Equivalent to Java's compressEncode() using zlib (Deflater) and Base64."""
+# Upper bound for a decoded model blob, guards against decompression bombs
+MAX_DECOMPRESSED_SIZE = int(os.environ.get("MAX_DECOMPRESSED_SIZE", str(256 * 1024 * 1024)))
+DECODE_CHUNK_SIZE = 64 * 1024
+
+_NON_BASE64 = re.compile(rb"[^A-Za-z0-9+/=]")
+
+def compress_encode(data: bytes, level: int = -1) -> str:
+    """Equivalent to Java's compressEncode() using zlib (Deflater) and Base64.
+
+    level is the zlib level (0-9, -1 = zlib's default 6, like Java's Deflater); every level
+    produces a standard zlib stream, so the output decodes the same way.
+    """
     # Compress the bytes (zlib.compress matches Java's default Deflater format)
-    compressed_data = zlib.compress(data)
+    compressed_data = zlib.compress(data, level)
     # Encode to Base64 and return as a UTF-8 string
     return base64.b64encode(compressed_data).decode('utf-8')
 
+def serialize_model(data) -> bytes:
+    """Compact JSON bytes of a parsed model (no whitespace, key order kept, ASCII-only like json.dumps)."""
+    return json.dumps(data, separators=(",", ":"), check_circular=False).encode('utf-8')
+
+def encode_files(config_data) -> dict:
+    """Builds the exported binary files in memory: {file name: file bytes}."""
+    files = {}
+
+    # Remove AppsLshModels if present (no longer exported/required)
+    config_data.pop("AppsLshModels", None)
+
+    # --- File 2: Process OnDeviceModels (anagog_js_model.bin) ---
+    if "OnDeviceModels" in config_data:
+        on_device_models = config_data.pop("OnDeviceModels") # Removes it from config_data
+        js_models_str = json.dumps(on_device_models)
+        files["anagog_js_model.bin"] = compress_encode(js_models_str.encode('utf-8')).encode('utf-8')
+
+    # --- File 3: Process the remaining configuration (anagog_config.bin) ---
+    config_str = json.dumps(config_data)
+    files["anagog_config.bin"] = compress_encode(config_str.encode('utf-8')).encode('utf-8')
+    return files
+
+def write_zip(config_data, fileobj):
+    """Writes the exported binary files as a ZIP archive into a writable file object."""
+    files = encode_files(config_data)
+    with zipfile.ZipFile(fileobj, 'w', compression=zipfile.ZIP_DEFLATED) as zf:
+        for name, content in files.items():
+            zf.writestr(name, content)
+    return list(files)
+
 def encrypt(config_data, output_dir: str = "."):
     """Equivalent to Java's encrypt(Context ctx)."""
     try:
-        # Remove AppsLshModels if present (no longer exported/required)
-        config_data.pop("AppsLshModels", None)
-
-        # --- File 2: Process OnDeviceModels (anagog_js_model.bin) ---
-        if "OnDeviceModels" in config_data:
-            on_device_models = config_data.pop("OnDeviceModels") # Removes it from config_data
-            js_models_str = json.dumps(on_device_models)
-            encoded_js = compress_encode(js_models_str.encode('utf-8'))
-            
-            js_file_path = os.path.join(output_dir, "anagog_js_model.bin")
-            with open(js_file_path, 'wb') as f:
-                f.write(encoded_js.encode('utf-8'))
-                
-        # --- File 3: Process the remaining configuration (anagog_config.bin) ---
-        config_str = json.dumps(config_data)
-        encoded_config = compress_encode(config_str.encode('utf-8'))
-        
-        config_file_path = os.path.join(output_dir, "anagog_config.bin")
-        with open(config_file_path, 'wb') as f:
-            f.write(encoded_config.encode('utf-8'))
+        for name, content in encode_files(config_data).items():
+            with open(os.path.join(output_dir, name), 'wb') as f:
+                f.write(content)
             
         print("Successfully encrypted and exported all binary files.")
         
@@ -40,13 +65,80 @@ def encrypt(config_data, output_dir: str = "."):
         print(f"An error occurred: {e}")
         raise e
 
-def decrypt_js_model(data: bytes) -> dict:
+class DecodeLimitError(ValueError):
+    """Raised when a model blob decompresses to more than the allowed size."""
+
+class ModelDecoder:
+    """Incremental reverse of compress_encode: feed base64 chunks, then finish() to get the JSON.
+
+    Base64 and zlib are decoded chunk by chunk (zlib.decompressobj), so only the decompressed
+    JSON bytes are held in full. Decompression stops as soon as it would exceed max_size.
+    """
+
+    def __init__(self, max_size: int = None):
+        self.max_size = MAX_DECOMPRESSED_SIZE if max_size is None else max_size
+        self._inflater = zlib.decompressobj()
+        self._b64_tail = b""
+        self._buffer = bytearray()
+        self.input_bytes = 0
+        self.compressed_bytes = 0
+        self.peak_buffer_bytes = 0
+
+    def feed(self, chunk: bytes):
+        self.input_bytes += len(chunk)
+        # Same leniency as base64.b64decode: characters outside the alphabet are ignored
+        data = self._b64_tail + _NON_BASE64.sub(b"", bytes(chunk))
+        usable = len(data) - len(data) % 4
+        self._b64_tail = data[usable:]
+        if usable:
+            self._inflate(base64.b64decode(data[:usable]))
+        self._track(len(chunk))
+
+    def _inflate(self, compressed: bytes):
+        self.compressed_bytes += len(compressed)
+        data = compressed
+        while data:
+            # Never let zlib produce more than one byte past the limit
+            out = self._inflater.decompress(data, self.max_size - len(self._buffer) + 1)
+            self._append(out)
+            data = self._inflater.unconsumed_tail
+
+    def _append(self, out: bytes):
+        if len(self._buffer) + len(out) > self.max_size:
+            raise DecodeLimitError(f"Decompressed model exceeds the {self.max_size} byte limit")
+        self._buffer += out
+
+    def _track(self, in_flight: int):
+        self.peak_buffer_bytes = max(self.peak_buffer_bytes, len(self._buffer) + len(self._b64_tail) + in_flight)
+
+    def finish(self) -> dict:
+        if self._b64_tail:
+            # b64decode raises on incorrect padding exactly like the one-shot path
+            self._inflate(base64.b64decode(self._b64_tail))
+            self._b64_tail = b""
+        self._append(self._inflater.flush())
+        if not self._inflater.eof:
+            raise zlib.error("Error -5 while decompressing data: incomplete or truncated stream")
+        self._track(0)
+        return json.loads(self._buffer.decode('utf-8'))
+
+    def stats(self) -> dict:
+        return {
+            "input_bytes": self.input_bytes,
+            "compressed_bytes": self.compressed_bytes,
+            "decompressed_bytes": len(self._buffer),
+            "peak_buffer_bytes": self.peak_buffer_bytes,
+            "max_decompressed_bytes": self.max_size,
+        }
+
+def decrypt_js_model(data: bytes, max_size: int = None) -> dict:
     """Reverse of compress_encode: base64 decode, zlib decompress, decode to JSON."""
     try:
-        compressed_data = base64.b64decode(data)
-        decompressed_data = zlib.decompress(compressed_data)
-        json_str = decompressed_data.decode('utf-8')
-        return json.loads(json_str)
+        decoder = ModelDecoder(max_size)
+        view = memoryview(data)
+        for start in range(0, len(view), DECODE_CHUNK_SIZE):
+            decoder.feed(view[start:start + DECODE_CHUNK_SIZE])
+        return decoder.finish()
     except Exception as e:
         print(f"Decryption Error: {e}")
         raise e
@@ -1,43 +1,91 @@
+import startup # first: the startup profile measures everything imported after it
 import os
 from fastapi import FastAPI, HTTPException, UploadFile, File, Request
 from pydantic import BaseModel
+from typing import List, Optional
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse
-from google import genai
 import scraper_logic
-import shutil
+import app_catalog
+import async_scraper
+import metrics
+import genai_clients
+import batch_jobs
+import deadlines
+import play_transport
+import details_cache
+import encode_cache
+import research_cache
+import verify_cache
 import tempfile
 import json
+import time
 import ConfigExport
-from fastapi.responses import FileResponse, Response
+from fastapi.responses import FileResponse, PlainTextResponse, Response, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+
+startup.mark("imports")
 
 app = FastAPI()
 
+@app.on_event("startup")
+def start_catalog_refresher():
+    app_catalog.refresher.start()
+
+@app.on_event("startup")
+def warm_up_and_mark_ready():
+    # Registered last among the startup hooks, so "ready" includes the others
+    startup.on_startup()
+
+@app.on_event("shutdown")
+async def close_play_transport():
+    await play_transport.aclose()
+
+@app.on_event("shutdown")
+def stop_catalog_refresher():
+    app_catalog.refresher.stop(timeout=1)
+
+# ZIP exports larger than this are spooled to a private temp file instead of memory
+EXPORT_SPOOL_MAX_SIZE = int(os.environ.get("EXPORT_SPOOL_MAX_SIZE", str(16 * 1024 * 1024)))
+EXPORT_CHUNK_SIZE = 64 * 1024
+
 @app.post("/api/export-binary")
 async def export_binary(data: dict):
     
     try:
-        # Create a temporary directory for processing
-        with tempfile.TemporaryDirectory() as tmpdirname:
-            # The encrypt function in ConfigExport writes directly to files in the output_dir
-            ConfigExport.encrypt(data, output_dir=tmpdirname)
-            
-            # Check if any files were actually created
-            generated_files = os.listdir(tmpdirname)
+        # Build the archive per request (memory, or a private spool file above the threshold)
+        # so concurrent exports never share a path on disk
+        archive = tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_MAX_SIZE)
+        try:
+            # JSON + zlib + ZIP is CPU-bound: build it in a worker thread so other requests keep flowing
+            generated_files = await run_in_threadpool(ConfigExport.write_zip, data, archive)
             if not generated_files:
                 raise HTTPException(status_code=500, detail="No binary files were generated. Check JSON structure.")
+            size = archive.tell()
+            archive.seek(0)
+        except Exception:
+            archive.close()
+            raise
+
+        def iter_archive():
+            try:
+                for chunk in iter(lambda: archive.read(EXPORT_CHUNK_SIZE), b""):
+                    yield chunk
+            finally:
+                archive.close()
+
+        # Return the archive and include a header to trigger download
+        return StreamingResponse(
+            iter_archive(),
+            media_type='application/zip',
+            headers={
+                "Content-Disposition": 'attachment; filename="anagog_binary_export.zip"',
+                "Content-Length": str(size)
+            }
+        )
             
-            # Create a zip file in the system temp directory
-            zip_base = os.path.join(tempfile.gettempdir(), "anagog_binary_export")
-            zip_path_full = shutil.make_archive(zip_base, 'zip', tmpdirname)
-            
-            # Return the file and include a header to trigger download
-            return FileResponse(
-                zip_path_full, 
-                media_type='application/zip', 
-                filename="anagog_binary_export.zip"
-            )
-            
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"Export Binary Error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -45,9 +93,18 @@ async def export_binary(data: dict):
 @app.post("/api/read-binary")
 async def read_binary(file: UploadFile = File(...)):
     try:
-        content = await file.read()
-        json_data = ConfigExport.decrypt_js_model(content)
-        return {"data": json_data}
+        # Decode the upload chunk by chunk instead of reading it whole
+        decoder = ConfigExport.ModelDecoder()
+        while True:
+            chunk = await file.read(ConfigExport.DECODE_CHUNK_SIZE)
+            if not chunk:
+                break
+            decoder.feed(chunk)
+        json_data = decoder.finish()
+        return {"data": json_data, "decode_stats": decoder.stats()}
+    except ConfigExport.DecodeLimitError as e:
+        print(f"Read Binary Error: {e}")
+        raise HTTPException(status_code=413, detail=str(e))
     except Exception as e:
         print(f"Read Binary Error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -55,9 +112,8 @@ async def read_binary(file: UploadFile = File(...)):
 @app.post("/api/export-binary-model")
 async def export_binary_model(request: Request):
     try:
-        data = await request.json()
-        js_models_str = json.dumps(data)
-        encoded_js = ConfigExport.compress_encode(js_models_str.encode('utf-8'))
+        # Repeat exports of the same model are served from the encode cache
+        encoded_js, _ = encode_cache.encode_json(await request.body())
         return Response(content=encoded_js.encode('utf-8'), media_type="application/octet-stream")
     except Exception as e:
         print(f"Export Binary Model Error: {e}")
@@ -66,9 +122,7 @@ async def export_binary_model(request: Request):
 @app.post("/api/encode-zipped-model")
 async def encode_zipped_model(request: Request):
     try:
-        data = await request.json()
-        js_models_str = json.dumps(data)
-        encoded_js = ConfigExport.compress_encode(js_models_str.encode('utf-8'))
+        encoded_js, _ = encode_cache.encode_json(await request.body())
         return {"zipped_string": encoded_js}
     except Exception as e:
         print(f"Encode Zipped Model Error: {e}")
@@ -80,9 +134,15 @@ class ZippedModelRequest(BaseModel):
 @app.post("/api/read-zipped-model")
 async def read_zipped_model(request: ZippedModelRequest):
     try:
-        content = request.zipped_string.encode('utf-8')
-        json_data = ConfigExport.decrypt_js_model(content)
-        return {"data": json_data}
+        decoder = ConfigExport.ModelDecoder()
+        content = request.zipped_string
+        for start in range(0, len(content), ConfigExport.DECODE_CHUNK_SIZE):
+            decoder.feed(content[start:start + ConfigExport.DECODE_CHUNK_SIZE].encode('utf-8'))
+        json_data = decoder.finish()
+        return {"data": json_data, "decode_stats": decoder.stats()}
+    except ConfigExport.DecodeLimitError as e:
+        print(f"Read Zipped Model Error: {e}")
+        raise HTTPException(status_code=413, detail=str(e))
     except Exception as e:
         print(f"Read Zipped Model Error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -97,6 +157,11 @@ class SearchRequest(BaseModel):
     resolve_pkg_with_ai: bool = False
     api_key: str
     model_name: str
+    refresh: bool = False # Ignore the cached market research and ask Gemini again
+    timings: bool = False # Include a per-stage timing breakdown in the response
+    use_catalog: bool = True # Answer from the app catalog when this topic / region was searched before
+    stream_research: bool = True # Verify apps while Gemini is still generating the list
+    deadline_seconds: Optional[float] = None # Time budget for /api/search and /api/search/stream (default SEARCH_DEADLINE_SECONDS, 0 = none)
 
 class AIResolveRequest(BaseModel):
     app_name: str
@@ -104,13 +169,13 @@ class AIResolveRequest(BaseModel):
     model_name: str
 
 @app.post("/api/ai-resolve")
-def ai_resolve(request: AIResolveRequest):
+async def ai_resolve(request: AIResolveRequest):
     """
     Manually triggers AI resolution for a specific app name.
     """
     try:
-        client = genai.Client(api_key=request.api_key)
-        package_id = scraper_logic.find_id_via_gemini(client, [request.app_name], request.model_name)
+        client = genai_clients.get_client(request.api_key)
+        package_id = await async_scraper.find_id_via_gemini(client, [request.app_name], request.model_name)
         return {"package_id": package_id}
     except Exception as e:
         print(f"Server AI Resolve Error: {e}")
@@ -120,54 +185,293 @@ def ai_resolve(request: AIResolveRequest):
 def read_root():
     return FileResponse('static/index.html')
 
+def _catalog_lookup(request, region_code):
+    """
+    (apps, info) from the app catalog unless the request opts out or forces a refresh, or the
+    cataloged list was searched with another model / resolve_pkg_with_ai setting or has expired.
+    Stale entries are handed to the background refresher; the cataloged answer is returned as is.
+    """
+    if not request.use_catalog or request.refresh:
+        return None
+    cataloged = app_catalog.get(request.topic, region_code, request.model_name, request.resolve_pkg_with_ai)
+    if cataloged is not None:
+        print(f"📚 Answering {request.topic} / {region_code} from the app catalog ({cataloged[1]['stale']} stale)")
+        if cataloged[1]["stale"]:
+            app_catalog.refresher.wake()
+    return cataloged
+
+# Default time budget of /api/search. At the deadline the apps resolved so far are returned and
+# the rest come back as "Pending" (response["partial"] is true). 0 disables the deadline.
+SEARCH_DEADLINE_SECONDS = float(os.environ.get("SEARCH_DEADLINE_SECONDS", "0"))
+
 @app.post("/api/search")
-def search_apps(request: SearchRequest):
+async def search_apps(request: SearchRequest):
     try:
         # Initialize Client dynamically
-        client = genai.Client(api_key=request.api_key)
+        client = genai_clients.get_client(request.api_key)
         
         # Translate country name to code
         region_code = scraper_logic.translate_country_to_code(request.region)
         
         print(f" Starting search for topic: {request.topic} in region: {region_code} (input: {request.region}) using model: {request.model_name}")
+
+        # The catalog is SQLite: keep it off the event loop
+        cataloged = await run_in_threadpool(_catalog_lookup, request, region_code)
+        if cataloged is not None:
+            apps, catalog_info = cataloged
+            return {"data": apps, "region": region_code, "research_cache": None, "catalog": catalog_info,
+                    "partial": False, "pending": 0}
         
-        # 1. Get initial list
-        raw_results = scraper_logic.get_market_research(
-            request.topic, 
-            region_code, 
-            client, 
-            request.model_name
-        )
-        
-        # 2. Process and verify
-        final_results = scraper_logic.process_results(
-            raw_results, 
-            region_code, 
-            request.resolve_pkg_with_ai, 
-            client,
-            request.model_name,
-            category=request.topic
-        )
+        budget = request.deadline_seconds if request.deadline_seconds is not None else SEARCH_DEADLINE_SECONDS
+        deadline = deadlines.after(budget)
+        with metrics.request_timings() as timings, metrics.stage("search_request"), deadlines.scope(deadline):
+            # 1. Get initial list (served from the research cache unless refresh is set;
+            #    otherwise streamed from Gemini and verified as it arrives)
+            raw_results, research_cache_info = await async_scraper.get_market_research_source(
+                request.topic, 
+                region_code, 
+                client, 
+                request.model_name,
+                refresh=request.refresh,
+                stream=request.stream_research
+            )
+            
+            # 2. Process and verify
+            final_results = await async_scraper.process_results(
+                raw_results, 
+                region_code, 
+                request.resolve_pkg_with_ai, 
+                client,
+                request.model_name,
+                category=request.topic,
+                deadline=deadline
+            )
         
-        return {"data": final_results, "region": region_code}
+        # Cut short by the deadline: Pending apps, or a research list that never finished
+        partial = deadline is not None and time.monotonic() >= deadline
+        if not partial:
+            await run_in_threadpool(app_catalog.put, request.topic, region_code, final_results, request.model_name,
+                                    request.resolve_pkg_with_ai)
+        response = {"data": final_results, "region": region_code, "research_cache": research_cache_info,
+                    "catalog": {"hit": False}, "partial": partial,
+                    "pending": sum(1 for a in final_results if a.get("status") == scraper_logic.PENDING)}
+        if request.timings:
+            response["timings"] = timings.as_dict()
+        return response
     except Exception as e:
         # For debugging purposes
         print(f"Server Error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/api/search/stream")
+async def search_apps_stream(request: SearchRequest):
+    """
+    Streaming variant of /api/search (NDJSON, one JSON object per line):
+      {"event": "research", ...}  the raw Gemini list, before any verification (empty when streamed)
+      {"event": "research_app", "index": i, "data": {...}}  with stream_research, each app as Gemini writes it
+      {"event": "app", "index": i, "data": {...}}  one per app, in completion order
+      {"event": "done", ...}  summary
+    Errors after the stream has started are sent as {"event": "error", "detail": ...}.
+    A topic already in the app catalog is replayed from it as the same events (see use_catalog).
+    deadline_seconds works as in /api/search: at the deadline the apps still unresolved are sent as
+    "Pending" app events and the done event has partial set.
+    """
+    client = genai_clients.get_client(request.api_key)
+    region_code = scraper_logic.translate_country_to_code(request.region)
+    budget = request.deadline_seconds if request.deadline_seconds is not None else SEARCH_DEADLINE_SECONDS
+
+    def event_line(payload):
+        return json.dumps(payload) + "\n"
+
+    async def generate():
+        started = time.time()
+        deadline = deadlines.after(budget)
+        try:
+            # The catalog is SQLite: keep it off the event loop
+            cataloged = await run_in_threadpool(_catalog_lookup, request, region_code)
+            if cataloged is not None:
+                apps, catalog_info = cataloged
+                yield event_line({"event": "research", "region": region_code, "data": apps, "research_cache": None,
+                                  "catalog": catalog_info, "elapsed_seconds": round(time.time() - started, 3)})
+                for index, app_result in enumerate(apps):
+                    yield event_line({"event": "app", "index": index, "data": app_result})
+                yield event_line(_done_event(region_code, apps, started, catalog=catalog_info))
+                return
+
+            print(f" Starting streaming search for topic: {request.topic} in region: {region_code} (input: {request.region}) using model: {request.model_name}")
+            # No yield inside the scope: the deadline must not stay set in the response task between events
+            with deadlines.scope(deadline):
+                raw_results, research_cache_info = await async_scraper.get_market_research_source(
+                    request.topic,
+                    region_code,
+                    client,
+                    request.model_name,
+                    refresh=request.refresh,
+                    stream=request.stream_research
+                )
+            streamed = not isinstance(raw_results, list)
+            yield event_line({
+                "event": "research",
+                "region": region_code,
+                "data": [] if streamed else raw_results,
+                "research_cache": research_cache_info,
+                "elapsed_seconds": round(time.time() - started, 3)
+            })
+
+            final_results = {}
+            async for kind, index, app_result in async_scraper.iter_process_events(
+                raw_results,
+                region_code,
+                request.resolve_pkg_with_ai,
+                client,
+                request.model_name,
+                category=request.topic,
+                deadline=deadline
+            ):
+                if kind == "research":
+                    if streamed:
+                        yield event_line({"event": "research_app", "index": index, "data": app_result,
+                                          "elapsed_seconds": round(time.time() - started, 3)})
+                    continue
+                final_results[index] = app_result
+                yield event_line({"event": "app", "index": index, "data": app_result})
+
+            final_results = [final_results.get(i) for i in range(len(final_results))]
+
+            # Cut short by the deadline: Pending apps, or a research list that never finished
+            partial = deadline is not None and time.monotonic() >= deadline
+            if not partial:
+                await run_in_threadpool(app_catalog.put, request.topic, region_code, final_results, request.model_name,
+                                        request.resolve_pkg_with_ai)
+            yield event_line(_done_event(region_code, final_results, started, catalog={"hit": False}, partial=partial))
+        except Exception as e:
+            print(f"Server Stream Error: {e}")
+            yield event_line({"event": "error", "detail": str(e)})
+
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
+
+def _done_event(region_code, apps, started, catalog=None, partial=False):
+    verified = sum(1 for app in apps if app and app.get("status") == "Verified")
+    unknown = sum(1 for app in apps if app and app.get("status") == "Unknown")
+    pending = sum(1 for app in apps if app and app.get("status") == scraper_logic.PENDING)
+    return {
+        "event": "done",
+        "region": region_code,
+        "count": len(apps),
+        "verified": verified,
+        "unknown": unknown,
+        "pending": pending,
+        "not_found": len(apps) - verified - unknown - pending,
+        "partial": partial,
+        "catalog": catalog,
+        "elapsed_seconds": round(time.time() - started, 3)
+    }
+
+class BatchSearchPair(BaseModel):
+    topic: str
+    region: str
+
+class BatchSearchRequest(BaseModel):
+    pairs: List[BatchSearchPair]
+    resolve_pkg_with_ai: bool = False
+    api_key: str
+    model_name: str
+    refresh: bool = False
+
+@app.post("/api/batch-search")
+def batch_search(request: BatchSearchRequest):
+    """
+    Queues a background search for every (topic, region) pair. Returns the job ID to poll.
+    """
+    if not request.pairs:
+        raise HTTPException(status_code=400, detail="No (topic, region) pairs given")
+    client = genai_clients.get_client(request.api_key)
+    job = batch_jobs.submit(
+        [(p.topic, p.region) for p in request.pairs],
+        request.resolve_pkg_with_ai,
+        client,
+        request.model_name,
+        refresh=request.refresh
+    )
+    return {"job_id": job.job_id, "total": len(request.pairs)}
+
+@app.get("/api/batch-search/{job_id}")
+def batch_search_status(job_id: str):
+    job = batch_jobs.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.summary()
+
+@app.get("/api/batch-search/{job_id}/pairs/{index}")
+def batch_search_pair(job_id: str, index: int):
+    job = batch_jobs.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if index < 0 or index >= len(job.pairs):
+        raise HTTPException(status_code=404, detail="Pair not found")
+    return job.pair_result(index)
+
 @app.get("/api/models")
-def get_models(api_key: str):
+def get_models(api_key: str, refresh: bool = False):
     try:
-        temp_client = genai.Client(api_key=api_key)
-        models = scraper_logic.list_supported_models(temp_client)
+        models = genai_clients.get_supported_models(api_key, refresh=refresh)
         return {"models": models}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/metrics")
+def get_metrics():
+    """
+    Prometheus text exposition: stage / upstream latency histograms, verify outcomes,
+    resolve paths, plus cache and connection pool counters.
+    """
+    verify_stats = verify_cache.get_stats()
+    body = metrics.render({
+        "app_search_verify_cache": (verify_stats, {"hits", "misses", "positive_hits", "negative_hits", "writes", "evictions", "errors"}),
+        "app_search_research_cache": (research_cache.get_stats(), {"hits", "misses", "disk_hits", "writes"}),
+        "app_search_details_cache": (details_cache.get_stats(), {"hits", "misses", "negative_hits", "writes"}),
+        "app_search_encode_cache": (encode_cache.get_stats(), {"hits", "misses", "evictions"}),
+        "app_search_catalog": (app_catalog.get_stats(), {"hits", "misses", "expired", "mismatches", "writes", "refreshed", "refresh_changes", "pruned", "errors"}),
+        "app_search_play_transport": (play_transport.get_stats(), {"requests", "errors", "async_requests", "async_errors", "retries", "throttled", "probes", "bytes_received", "new_connections", "async_new_connections", "reused_connections"}),
+        "app_search_genai_clients": (genai_clients.get_stats(), {"client_hits", "client_misses", "client_evictions", "model_hits", "model_misses"}),
+        "app_search_startup": (startup.get_stats(), set()),
+    })
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4")
+
+@app.get("/api/startup-profile")
+def startup_profile():
+    """
+    Cold start profile of this process: interpreter start, import / app / ready phases,
+    warm-up of the lazily imported SDKs.
+    """
+    return startup.get_report()
+
+@app.get("/api/transport-stats")
+def transport_stats():
+    """
+    Connection pool / keep-alive reuse counters for Play Store traffic.
+    """
+    return play_transport.get_stats()
+
+@app.get("/api/cache-stats")
+def cache_stats():
+    """
+    Hit / miss counters for the shared caches, plus calls coalesced by single-flight.
+    """
+    return {
+        "verify": verify_cache.get_stats(),
+        "research": research_cache.get_stats(),
+        "app_details": details_cache.get_stats(),
+        "model_encode": encode_cache.get_stats(),
+        "catalog": app_catalog.get_stats(),
+        "genai_clients": genai_clients.get_stats(),
+        "single_flight": scraper_logic.get_single_flight_stats()
+    }
+
 @app.get("/api/verify")
-def verify_package(package_name: str, app_name: str = "", region: str = "US", skip_search: bool = False):
+async def verify_package(package_name: str, app_name: str = "", region: str = "US", skip_search: bool = False):
     region_code = scraper_logic.translate_country_to_code(region)
-    working_region = scraper_logic.verify_package_exists(package_name, region=region_code)
+    status, working_region = await async_scraper.verify_package_status(package_name, region=region_code)
     
     if working_region:
         return {
@@ -176,15 +480,27 @@ def verify_package(package_name: str, app_name: str = "", region: str = "US", sk
             "region": working_region,
             "play_store_url": f"https://play.google.com/store/apps/details?id={package_name}&gl={working_region}"
         }
+
+    # Play Store was throttling / failing: report it instead of searching for a replacement
+    if status == scraper_logic.UNKNOWN:
+        return {
+            "status": "Unknown",
+            "package": package_name,
+            "region": region_code,
+            "play_store_url": f"https://play.google.com/store/apps/details?id={package_name}&gl={region_code}"
+        }
     
     # Re-use logic: if not found, try searching by name
     if app_name and not skip_search:
         print(f"❌ Verification for {package_name} (region: {region_code}) failed. Attempting search for {app_name}...")
-        results = scraper_logic.get_package_by_name(app_name, region=region_code)
+        results = await async_scraper.get_package_by_name(app_name, region=region_code)
         if results:
             new_package = results[0]
-            # Try verification with fallbacks for the new package too
-            working_region = scraper_logic.verify_package_exists(new_package, region=region_code)
+            if scraper_logic.SEARCH_RESULTS_VERIFIED:
+                # Taken from a live listing for this region, no need to check it again
+                _, working_region = await async_scraper.search_hit(new_package, region_code)
+            else:
+                working_region = await async_scraper.verify_package_exists(new_package, region=region_code)
             if working_region:
                 print(f"✅ Found alternative via web search: {new_package} (in region: {working_region})")
                 return {
@@ -202,25 +518,46 @@ def verify_package(package_name: str, app_name: str = "", region: str = "US", sk
     }
 
 @app.get("/api/find-package")
-def find_package(app_name: str, region: str = "US"):
+async def find_package(app_name: str, region: str = "US"):
     """
     Attempts to find a package ID for a given app name.
     Returns the first matching package ID or None.
     """
     region_code = scraper_logic.translate_country_to_code(region)
-    packages = scraper_logic.get_package_by_name(app_name, region=region_code)
+    packages = await async_scraper.get_package_by_name(app_name, region=region_code)
     if packages:
         return {"package_id": packages[0]}
     return {"package_id": None}
 
 @app.get("/api/app-details")
-def app_details(package_id: str, region: str = "US"):
+async def app_details(package_id: str, region: str = "US"):
     region_code = scraper_logic.translate_country_to_code(region)
-    details = scraper_logic.get_app_details(package_id, region=region_code)
+    details = await async_scraper.get_app_details(package_id, region=region_code)
     if not details:
         raise HTTPException(status_code=404, detail="App not found")
     return details
+
+APP_DETAILS_BATCH_MAX = int(os.environ.get("APP_DETAILS_BATCH_MAX", "100"))
+
+class AppDetailsBatchRequest(BaseModel):
+    package_ids: List[str]
+    region: str = "US"
+    fields: Optional[List[str]] = None # e.g. ["title", "icon", "scoreText"]; all fields when omitted
+
+@app.post("/api/app-details/batch")
+async def app_details_batch(request: AppDetailsBatchRequest):
+    """
+    Details for a whole result table in one call. Lookups run concurrently, repeats come from
+    the details cache, and a package that fails is reported in its own entry.
+    """
+    if len(request.package_ids) > APP_DETAILS_BATCH_MAX:
+        raise HTTPException(status_code=400, detail=f"At most {APP_DETAILS_BATCH_MAX} packages per batch")
+    region_code = scraper_logic.translate_country_to_code(request.region)
+    results = await async_scraper.get_app_details_batch(request.package_ids, region=region_code, fields=request.fields)
+    return {"region": region_code, "results": results}
     
+startup.mark("app")
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
@@ -0,0 +1,308 @@
+import copy
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import scraper_logic
+
+# Persistent catalog of the apps found for each (topic, region): package, name, status, region and
+# when each entry was last verified. /api/search can answer from it, and a background
+# CatalogRefresher re-verifies only entries older than CATALOG_STALE_AFTER, at most
+# CATALOG_REFRESH_RATE checks per second (per process). Re-verification never changes which apps
+# are listed, so a list older than CATALOG_MAX_AGE (since its search) is no longer served and is
+# replaced by the next search. A list is only served to searches with the same model and
+# resolve-with-AI setting that produced it.
+
+CATALOG_ENABLED = os.environ.get("CATALOG_ENABLED", "1") != "0"
+CATALOG_PATH = os.environ.get(
+    "CATALOG_PATH", os.path.join(tempfile.gettempdir(), "app_search_catalog.sqlite3")
+)
+CATALOG_STALE_AFTER = float(os.environ.get("CATALOG_STALE_AFTER", str(24 * 3600)))
+CATALOG_MAX_AGE = float(os.environ.get("CATALOG_MAX_AGE", str(7 * 24 * 3600)))
+CATALOG_REFRESH_RATE = float(os.environ.get("CATALOG_REFRESH_RATE", "1"))
+CATALOG_REFRESH_BATCH = int(os.environ.get("CATALOG_REFRESH_BATCH", "100"))
+CATALOG_REFRESH_INTERVAL = float(os.environ.get("CATALOG_REFRESH_INTERVAL", "300"))
+
+_local = threading.local()
+_stats_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "expired": 0, "mismatches": 0, "writes": 0, "refreshed": 0, "refresh_changes": 0,
+          "pruned": 0, "errors": 0}
+
+
+def _connect():
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = sqlite3.connect(CATALOG_PATH, timeout=5, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS catalog_apps (
+                topic_key TEXT NOT NULL,
+                region TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                topic TEXT NOT NULL,
+                package TEXT,
+                name TEXT,
+                status TEXT,
+                app_region TEXT,
+                data TEXT NOT NULL,
+                discovered_at REAL NOT NULL,
+                last_verified REAL NOT NULL,
+                model_name TEXT,
+                resolve_with_ai INTEGER,
+                PRIMARY KEY (topic_key, region, position)
+            )
+            """
+        )
+        # Catalogs written before lists were tagged with how they were searched
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(catalog_apps)")}
+        for column, kind in (("model_name", "TEXT"), ("resolve_with_ai", "INTEGER")):
+            if column not in columns:
+                conn.execute(f"ALTER TABLE catalog_apps ADD COLUMN {column} {kind}")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_catalog_apps_last_verified ON catalog_apps (last_verified)")
+        _local.conn = conn
+    return conn
+
+
+def _bump(name, amount=1):
+    with _stats_lock:
+        _stats[name] += amount
+
+
+def _topic_key(topic):
+    return " ".join(str(topic).lower().split())
+
+
+def get(topic, region, model_name=None, resolve_with_ai=False):
+    """
+    Returns (apps, info) for a cataloged (topic, region) that was searched with model_name and
+    resolve_with_ai no longer than CATALOG_MAX_AGE ago, None otherwise.
+    info: {"hit", "age_seconds" (oldest verification), "list_age_seconds" (since the search),
+    "stale" (entries due for re-verification)}.
+    """
+    if not CATALOG_ENABLED:
+        return None
+    try:
+        rows = _connect().execute(
+            "SELECT data, status, last_verified, discovered_at, model_name, resolve_with_ai FROM catalog_apps "
+            "WHERE topic_key = ? AND region = ? ORDER BY position",
+            (_topic_key(topic), region),
+        ).fetchall()
+    except sqlite3.Error as e:
+        print(f"Catalog Error: {e}")
+        _bump("errors")
+        return None
+    if not rows:
+        _bump("misses")
+        return None
+
+    now = time.time()
+    discovered = min(row[3] for row in rows)
+    if now - discovered >= CATALOG_MAX_AGE:
+        _bump("expired")
+        return None
+    if rows[0][4] != model_name or rows[0][5] != int(bool(resolve_with_ai)):
+        _bump("mismatches")
+        return None
+    apps = [json.loads(row[0]) for row in rows]
+    oldest = min(row[2] for row in rows)
+    stale = sum(1 for row in rows if now - row[2] >= CATALOG_STALE_AFTER or row[1] == scraper_logic.UNKNOWN)
+    _bump("hits")
+    return apps, {"hit": True, "age_seconds": round(now - oldest, 1), "list_age_seconds": round(now - discovered, 1),
+                  "stale": stale}
+
+
+def put(topic, region, apps, model_name=None, resolve_with_ai=False):
+    """
+    Replaces the catalog entries of (topic, region) with a fresh search result, tagged with the
+    model and resolve-with-AI setting it was searched with.
+    Unknown entries are stored as already stale, so the refresher retries them first.
+    """
+    if not CATALOG_ENABLED or not apps:
+        return
+    key = _topic_key(topic)
+    now = time.time()
+    rows = [
+        (key, region, position, topic, app.get("package"), app.get("name"), app.get("status"), app.get("region"),
+         json.dumps(app), now, 0.0 if app.get("status") == scraper_logic.UNKNOWN else now, model_name,
+         int(bool(resolve_with_ai)))
+        for position, app in enumerate(apps)
+        if app is not None
+    ]
+    try:
+        conn = _connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM catalog_apps WHERE topic_key = ? AND region = ?", (key, region))
+            conn.executemany(
+                "INSERT INTO catalog_apps (topic_key, region, position, topic, package, name, status, app_region, "
+                "data, discovered_at, last_verified, model_name, resolve_with_ai) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        _bump("writes")
+    except sqlite3.Error as e:
+        print(f"Catalog Error: {e}")
+        _bump("errors")
+
+
+def stale_entries(limit, now=None):
+    """
+    Up to limit entries due for re-verification, least recently verified first:
+    [(topic_key, region, position, topic, app)]. Entries of expired lists are left out.
+    """
+    now = time.time() if now is None else now
+    rows = _connect().execute(
+        "SELECT topic_key, region, position, topic, data FROM catalog_apps "
+        "WHERE (last_verified < ? OR status = ?) AND discovered_at > ? ORDER BY last_verified ASC LIMIT ?",
+        (now - CATALOG_STALE_AFTER, scraper_logic.UNKNOWN, now - CATALOG_MAX_AGE, limit),
+    ).fetchall()
+    return [(row[0], row[1], row[2], row[3], json.loads(row[4])) for row in rows]
+
+
+def prune_expired(now=None):
+    """
+    Deletes the entries of lists older than CATALOG_MAX_AGE. Returns how many were deleted.
+    """
+    now = time.time() if now is None else now
+    deleted = _connect().execute("DELETE FROM catalog_apps WHERE discovered_at <= ?", (now - CATALOG_MAX_AGE,)).rowcount
+    if deleted:
+        _bump("pruned", deleted)
+    return deleted
+
+
+def update_entry(topic_key, region, position, app, verified_at):
+    _connect().execute(
+        "UPDATE catalog_apps SET package = ?, status = ?, app_region = ?, data = ?, last_verified = ? "
+        "WHERE topic_key = ? AND region = ? AND position = ?",
+        (app.get("package"), app.get("status"), app.get("region"), json.dumps(app), verified_at,
+         topic_key, region, position),
+    )
+
+
+def revalidate(topic_key, region, position, topic, app):
+    """
+    Re-verifies one catalog entry (no new search) and stores the outcome. Returns the updated app.
+    An Unknown outcome keeps the previous status and leaves the entry stale.
+    """
+    previous = app.get("status")
+    status, working_region = scraper_logic.verify_package_status(app.get("package"), region=region, use_cache=False)
+    if status == scraper_logic.UNKNOWN:
+        return app
+    updated = scraper_logic.finish_app(copy.deepcopy(app), app.get("package"), working_region, region,
+                                       category=topic, status=status)
+    update_entry(topic_key, region, position, updated, time.time())
+    _bump("refreshed")
+    if updated.get("status") != previous:
+        _bump("refresh_changes")
+    return updated
+
+
+class CatalogRefresher:
+    """
+    Background thread that re-verifies stale catalog entries, paced to CATALOG_REFRESH_RATE
+    checks per second. Runs a pass every CATALOG_REFRESH_INTERVAL seconds or when woken.
+    """
+
+    def __init__(self, rate=None, batch=None, interval=None):
+        self.rate = CATALOG_REFRESH_RATE if rate is None else rate
+        self.batch = CATALOG_REFRESH_BATCH if batch is None else batch
+        self.interval = CATALOG_REFRESH_INTERVAL if interval is None else interval
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self.passes = 0
+
+    def start(self):
+        if not CATALOG_ENABLED or self.rate <= 0 or (self._thread and self._thread.is_alive()):
+            return self
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="catalog-refresher", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def wake(self):
+        """
+        Starts a pass now (e.g. after /api/search answered with stale entries).
+        """
+        self._wake.set()
+
+    def run_once(self):
+        """
+        Re-verifies up to batch stale entries. Returns how many were checked.
+        """
+        try:
+            prune_expired()
+            entries = stale_entries(self.batch)
+        except sqlite3.Error as e:
+            print(f"Catalog Error: {e}")
+            _bump("errors")
+            return 0
+        checked = 0
+        for entry in entries:
+            if self._stop.is_set():
+                break
+            started = time.monotonic()
+            try:
+                revalidate(*entry)
+            except Exception as e:
+                print(f"Catalog Refresh Error for {entry[4].get('package')}: {e}")
+                _bump("errors")
+            checked += 1
+            # Rate budget: one check per 1 / rate seconds
+            self._stop.wait(max(0.0, 1.0 / self.rate - (time.monotonic() - started)))
+        self.passes += 1
+        return checked
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.run_once()
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+
+refresher = CatalogRefresher()
+
+
+def clear():
+    if not CATALOG_ENABLED:
+        return
+    try:
+        _connect().execute("DELETE FROM catalog_apps")
+    except sqlite3.Error as e:
+        print(f"Catalog Error: {e}")
+
+
+def get_stats():
+    with _stats_lock:
+        stats = dict(_stats)
+    stats["enabled"] = CATALOG_ENABLED
+    stats["path"] = CATALOG_PATH
+    stats["refresh_passes"] = refresher.passes
+    stats["entries"] = None
+    stats["stale"] = None
+    if CATALOG_ENABLED:
+        try:
+            conn = _connect()
+            stats["entries"] = conn.execute("SELECT COUNT(*) FROM catalog_apps").fetchone()[0]
+            stats["stale"] = conn.execute(
+                "SELECT COUNT(*) FROM catalog_apps WHERE last_verified < ? OR status = ?",
+                (time.time() - CATALOG_STALE_AFTER, scraper_logic.UNKNOWN),
+            ).fetchone()[0]
+        except sqlite3.Error as e:
+            print(f"Catalog Error: {e}")
+    return stats
@@ -0,0 +1,529 @@
+import asyncio
+import contextvars
+import copy
+import json
+import os
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+import deadlines
+import metrics
+import play_transport
+import research_cache
+import scraper_logic
+import verify_cache
+
+# Async versions of the scraper_logic network functions, for the async FastAPI handlers.
+# Prompts, parsing, caching and logging are shared with scraper_logic; only the I/O differs
+# (httpx.AsyncClient for Play Store, client.aio for Gemini). Concurrency is bounded by
+# explicit per-event-loop semaphores instead of the Starlette threadpool size.
+
+ASYNC_PLAY_CONCURRENCY = int(os.environ.get("ASYNC_PLAY_CONCURRENCY", "32"))
+ASYNC_GEMINI_CONCURRENCY = int(os.environ.get("ASYNC_GEMINI_CONCURRENCY", "8"))
+# google_play_scraper has no async API; its calls run in threads, at most this many at once
+ASYNC_SCRAPER_CONCURRENCY = int(os.environ.get("ASYNC_SCRAPER_CONCURRENCY", "8"))
+# verify_cache (SQLite) reads / writes of the async paths run on threads of their own, so a verify
+# never waits behind multi-second google_play_scraper calls for a worker thread
+CACHE_IO_THREADS = int(os.environ.get("CACHE_IO_THREADS", "4"))
+# Lookups in flight per get_app_details_batch call (all calls share ASYNC_SCRAPER_CONCURRENCY)
+APP_DETAILS_BATCH_CONCURRENCY = int(os.environ.get("APP_DETAILS_BATCH_CONCURRENCY", "4"))
+
+
+class _Limits:
+    def __init__(self):
+        self.play = asyncio.Semaphore(ASYNC_PLAY_CONCURRENCY)
+        self.gemini = asyncio.Semaphore(ASYNC_GEMINI_CONCURRENCY)
+        self.scraper = asyncio.Semaphore(ASYNC_SCRAPER_CONCURRENCY)
+
+
+_limits = weakref.WeakKeyDictionary()  # event loop -> _Limits
+_scraper_executor = ThreadPoolExecutor(max_workers=max(1, ASYNC_SCRAPER_CONCURRENCY), thread_name_prefix="async-scraper")
+_cache_executor = ThreadPoolExecutor(max_workers=max(1, CACHE_IO_THREADS), thread_name_prefix="cache-io")
+
+
+def limits():
+    loop = asyncio.get_running_loop()
+    current = _limits.get(loop)
+    if current is None:
+        current = _limits[loop] = _Limits()
+    return current
+
+
+async def _run_in(executor, fn, *args):
+    # asyncio.to_thread on a dedicated executor instead of the loop's shared default one
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, contextvars.copy_context().run, fn, *args)
+
+
+async def get_market_research(topic, region, client, model_name):
+    """
+    Async scraper_logic.get_market_research.
+    """
+    try:
+        async with limits().gemini:
+            with metrics.stage("market_research"), metrics.upstream("gemini"):
+                response = await asyncio.wait_for(client.aio.models.generate_content(
+                    model=model_name,
+                    contents=scraper_logic.market_research_prompt(topic, region),
+                    config=scraper_logic.market_research_config(model_name)
+                ), deadlines.remaining())
+        return json.loads(scraper_logic.strip_json_fences(response.text))
+    except Exception as e:
+        print(f"Gemini Error: {e}")
+        return []
+
+
+async def get_market_research_cached(topic, region, client, model_name, refresh=False):
+    """
+    Async scraper_logic.get_market_research_cached (same research_cache).
+    """
+    if not refresh:
+        cached = scraper_logic.research_cache_lookup(topic, region, model_name)
+        if cached is not None:
+            return cached
+
+    apps = await get_market_research(topic, region, client, model_name)
+    research_cache.put(topic, region, model_name, apps)
+    return apps, {"hit": False, "age_seconds": 0.0}
+
+
+async def iter_market_research(topic, region, client, model_name):
+    """
+    Streaming get_market_research (client.aio's streaming API): yields each app dict as soon as
+    Gemini has finished writing it, so verification can start while the rest of the list is still
+    being generated. The complete list is stored in research_cache once the array is closed; a
+    reply the streaming parser found no apps in is parsed whole at the end instead.
+    """
+    parser = scraper_logic.JsonArrayStream()
+    apps = []
+    text = []
+    try:
+        async with limits().gemini:
+            with metrics.stage("market_research"), metrics.upstream("gemini"):
+                async for chunk in await client.aio.models.generate_content_stream(
+                    model=model_name,
+                    contents=scraper_logic.market_research_prompt(topic, region),
+                    config=scraper_logic.market_research_config(model_name)
+                ):
+                    text.append(scraper_logic.chunk_text(chunk))
+                    for app in parser.feed(text[-1]):
+                        apps.append(copy.deepcopy(app))
+                        yield app
+    except Exception as e:
+        print(f"Gemini Error: {e}")
+    if not apps:
+        fallback = scraper_logic.research_fallback("".join(text))
+        if fallback is not None:
+            research_cache.put(topic, region, model_name, fallback)
+            for app in fallback:
+                yield app
+        return
+    if parser.done:
+        research_cache.put(topic, region, model_name, apps)
+
+
+async def get_market_research_source(topic, region, client, model_name, refresh=False, stream=True):
+    """
+    get_market_research_cached, except that on a cache miss with stream=True the apps come back as
+    an async iterator (iter_market_research) that process_results / iter_process_events verify from
+    while Gemini is still writing. Returns (apps list or async iterator, cache_info).
+    """
+    if not stream:
+        return await get_market_research_cached(topic, region, client, model_name, refresh=refresh)
+    if not refresh:
+        cached = scraper_logic.research_cache_lookup(topic, region, model_name)
+        if cached is not None:
+            return cached
+    return iter_market_research(topic, region, client, model_name), {"hit": False, "age_seconds": 0.0, "streamed": True}
+
+
+async def _verify_cache_call(fn, *args):
+    # verify_cache is SQLite (up to a 5 s busy timeout under write contention between workers):
+    # its reads / writes run on the CACHE_IO_THREADS executor so they never block the event loop
+    if not verify_cache.VERIFY_CACHE_ENABLED:
+        return fn(*args)
+    return await _run_in(_cache_executor, fn, *args)
+
+
+async def check_region(package_name, region, timeout=None, use_cache=True, probe=None):
+    """
+    Async scraper_logic.check_region: True (200), False (404) or None (could not check).
+    """
+    if use_cache:
+        cached = await _verify_cache_call(scraper_logic.cached_check, package_name, region)
+        if cached is not None:
+            return cached
+
+    try:
+        async with limits().play:
+            with metrics.upstream("play_details"):
+                status_code = await play_transport.aprobe(scraper_logic.details_url(package_name, region),
+                                                          mode=probe, timeout=timeout)
+    except Exception as e:
+        return scraper_logic.record_check_error(package_name, region, e)
+    return await _verify_cache_call(scraper_logic.record_check, package_name, region, status_code)
+
+
+async def search_hit(pkg, region):
+    """
+    Async scraper_logic.search_hit (its verify_cache write runs off the event loop).
+    """
+    return await _verify_cache_call(scraper_logic.search_hit, pkg, region)
+
+
+async def _verify_regions_parallel(package_name, regions_to_try, timeout=None, use_cache=True, probe=None):
+    # scraper_logic._verify_regions_parallel on asyncio tasks (same RegionVerdict); losing probes are cancelled
+    verdict = scraper_logic.RegionVerdict(regions_to_try)
+    tasks = {
+        asyncio.ensure_future(check_region(package_name, r, timeout, use_cache, probe)): r
+        for r in regions_to_try
+    }
+    try:
+        pending = set(tasks)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                decided = verdict.add(tasks[task], task.result())
+                if decided:
+                    return decided
+        return verdict.result()
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def verify_package_status(package_name, region="US", use_fallbacks=False, timeout=None, use_cache=True, parallel=None,
+                                probe=None):
+    """
+    Async scraper_logic.verify_package_status, coalesced with identical calls in flight on this loop.
+    """
+    scraper_logic.check_probe_mode(probe)
+    key = (package_name, region, use_fallbacks, timeout, use_cache, parallel, probe)
+    return await scraper_logic.verify_flight.ado_deadline(key, (scraper_logic.UNKNOWN, None), _verify_package_status, *key)
+
+
+async def _verify_package_status(package_name, region, use_fallbacks, timeout, use_cache, parallel, probe):
+    regions_to_try = scraper_logic.regions_to_check(region, use_fallbacks)
+    if parallel is None:
+        parallel = scraper_logic.VERIFY_PARALLEL_FALLBACKS
+    with metrics.stage("verify"):
+        if parallel and len(regions_to_try) > 1:
+            return await _verify_regions_parallel(package_name, regions_to_try, timeout=timeout, use_cache=use_cache,
+                                                  probe=probe)
+
+        verdict = scraper_logic.RegionVerdict(regions_to_try)
+        for r in regions_to_try:
+            decided = verdict.add(r, await check_region(package_name, r, timeout=timeout, use_cache=use_cache,
+                                                        probe=probe))
+            if decided:
+                return decided
+    return verdict.result()
+
+
+async def verify_package_exists(package_name, region="US", use_fallbacks=False, timeout=None, use_cache=True, parallel=None,
+                                probe=None):
+    """
+    Async scraper_logic.verify_package_exists.
+    """
+    return (await verify_package_status(package_name, region=region, use_fallbacks=use_fallbacks, timeout=timeout,
+                                        use_cache=use_cache, parallel=parallel, probe=probe))[1]
+
+
+async def get_package_by_name(query, region="US", timeout=None, max_ids=None):
+    """
+    Async scraper_logic.get_package_by_name (streamed, stops after max_ids IDs), coalesced like verify.
+    """
+    key = (query, region, timeout, max_ids)
+    return await scraper_logic.search_flight.ado_deadline(key, [], _get_package_by_name, *key)
+
+
+async def _get_package_by_name(query, region, timeout, max_ids):
+    extractor = scraper_logic.PackageIdExtractor(max_ids)
+    try:
+        async with limits().play:
+            with metrics.upstream("play_search"):
+                async with play_transport.astream(scraper_logic.search_url(query, region), timeout=timeout) as response:
+                    if response.status_code != 200:
+                        print(f"Search for {query} returned status {response.status_code}")
+                        return []
+                    async for chunk in response.aiter_bytes(scraper_logic.SEARCH_CHUNK_SIZE):
+                        if extractor.feed(chunk):
+                            break
+        return scraper_logic.log_package_ids(query, extractor.finish())
+    except Exception as e:
+        print(f"Error searching for {query}: {e}")
+        return []
+
+
+async def _find_ids_chunk(client, app_names, model_name):
+    print(f"   🤖 Asking Gemini to find IDs for {len(app_names)} app(s): {', '.join(app_names)}...")
+    try:
+        async with limits().gemini:
+            with metrics.upstream("gemini"):
+                response = await asyncio.wait_for(client.aio.models.generate_content(
+                    model=model_name,
+                    contents=scraper_logic.resolve_prompt(app_names),
+                    config=scraper_logic.resolve_config()
+                ), deadlines.remaining())
+        return scraper_logic.parse_resolve_text(response.text, app_names)
+    except Exception as e:
+        print(f"Error: {e}")
+        return {}
+
+
+async def find_ids_via_gemini(client, app_names, model_name, chunk_size=None):
+    """
+    Async scraper_logic.find_ids_via_gemini; chunks run concurrently.
+    """
+    names, chunks = scraper_logic.chunk_names(app_names, chunk_size)
+    if not names:
+        return {}
+    resolved = {}
+    for chunk_result in await asyncio.gather(*(_find_ids_chunk(client, chunk, model_name) for chunk in chunks)):
+        resolved.update(chunk_result)
+    return {name: resolved.get(name) for name in names}
+
+
+async def find_id_via_gemini(client, app_names, model_name):
+    if not app_names:
+        return None
+    return (await find_ids_via_gemini(client, app_names[:1], model_name)).get(app_names[0])
+
+
+async def get_app_details(package_id, region="US"):
+    """
+    Async scraper_logic.get_app_details.
+    """
+    try:
+        return await fetch_app_details(package_id, region)
+    except Exception as e:
+        print(f"Error fetching app details for {package_id}: {e}")
+        return None
+
+
+async def fetch_app_details(package_id, region="US", use_cache=True):
+    """
+    scraper_logic.fetch_app_details in a worker thread, bounded by ASYNC_SCRAPER_CONCURRENCY
+    and coalesced with identical lookups in flight on this loop.
+    """
+    if use_cache:
+        hit, details = scraper_logic.cached_app_details(package_id, region)
+        if hit:
+            return details
+    return await scraper_logic.details_flight.ado((package_id, region), _fetch_app_details, package_id, region)
+
+
+async def _fetch_app_details(package_id, region):
+    async with limits().scraper:
+        return await _run_in(_scraper_executor, scraper_logic.scrape_app_details, package_id, region)
+
+
+async def get_app_details_batch(package_ids, region="US", fields=None, max_concurrency=None):
+    """
+    Details for several packages, fetched concurrently (max_concurrency, default
+    APP_DETAILS_BATCH_CONCURRENCY) and projected to fields when given.
+    Returns one entry per unique package, in input order: {"package", "status": "ok", "cached", "details"}
+    or {"package", "status": "not_found" / "error", "error"}. One failure never fails the batch.
+    """
+    per_request = asyncio.Semaphore(max(1, max_concurrency or APP_DETAILS_BATCH_CONCURRENCY))
+
+    async def one(package_id):
+        entry = {"package": package_id}
+        try:
+            hit, details = scraper_logic.cached_app_details(package_id, region)
+            if not hit:
+                async with per_request:
+                    details = await fetch_app_details(package_id, region, use_cache=False)
+            entry.update(status="ok", cached=hit, details=scraper_logic.project_fields(details, fields))
+        except scraper_logic.AppNotFoundError:
+            entry.update(status="not_found", error="App not found")
+        except Exception as e:
+            print(f"Error fetching app details for {package_id}: {e}")
+            entry.update(status="error", error=str(e) or type(e).__name__)
+        return entry
+
+    return list(await asyncio.gather(*(one(p) for p in dict.fromkeys(package_ids))))
+
+
+async def run_steps(steps, region):
+    """
+    Async scraper_logic.run_steps: runs a verify_or_search_steps / ai_candidate_steps generator with
+    this module's verify_package_status / get_package_by_name / search_hit.
+    """
+    result = None
+    try:
+        while True:
+            call, arg = steps.send(result)
+            if call == "verify":
+                result = await verify_package_status(arg, region=region)
+            elif call == "search":
+                with metrics.stage("web_search"):
+                    result = await get_package_by_name(arg, region=region)
+            else:
+                result = await search_hit(arg, region)
+    except StopIteration as done:
+        return done.value
+
+
+def _per_request_limit(max_concurrency):
+    # bounded(coro): runs coro with at most max_concurrency (default PROCESS_MAX_WORKERS) in flight
+    per_request = asyncio.Semaphore(max(1, max_concurrency or scraper_logic.PROCESS_MAX_WORKERS))
+
+    async def bounded(coro):
+        try:
+            async with per_request:
+                return await coro
+        finally:
+            coro.close() # cancelled while queued: never started, no "never awaited" warning
+    return bounded
+
+
+async def _process(raw_apps, apps, processed_list, region, resolve_with_ai, client, model_name, category, bounded,
+                   on_event=None):
+    # Fills apps (as they arrive) and processed_list (as each app is done) in place, so whatever
+    # finished is still there if the caller cancels this at the deadline.
+    # on_event(kind, index, app) is called with "research" on arrival and "app" when an app is done.
+    needs_ai = []
+    notify = on_event or (lambda kind, index, app: None)
+
+    async def first_pass(index, app):
+        steps = scraper_logic.verify_or_search_steps(app, region, category=category)
+        pkg, status, working_region, path = await bounded(run_steps(steps, region))
+        if deadlines.remaining() == 0:
+            return # answered only because the deadline cut a request short: stays Pending
+        if path is None and resolve_with_ai:
+            needs_ai.append(index)
+            return
+        metrics.RESOLVE_PATHS.inc(path=path or "web_search", status=scraper_logic.status_label(status))
+        processed_list[index] = scraper_logic.finish_app(app, pkg, working_region, region,
+                                                         category=category, status=status)
+        notify("app", index, processed_list[index])
+
+    async def second_pass(index, ai_pkg):
+        steps = scraper_logic.ai_candidate_steps(apps[index], ai_pkg)
+        pkg, status, working_region = await bounded(run_steps(steps, region))
+        if deadlines.remaining() == 0:
+            return
+        metrics.RESOLVE_PATHS.inc(path="ai", status=scraper_logic.status_label(status))
+        processed_list[index] = scraper_logic.finish_app(apps[index], pkg, working_region, region,
+                                                         category=category, status=status)
+        notify("app", index, processed_list[index])
+
+    tasks = []
+    try:
+        # 1. Verify every guess, falling back to Play Store search (iterators: as each app arrives)
+        if hasattr(raw_apps, "__aiter__"):
+            async for app in raw_apps:
+                apps.append(app)
+                processed_list.append(None)
+                notify("research", len(apps) - 1, dict(app))
+                tasks.append(asyncio.ensure_future(first_pass(len(apps) - 1, app)))
+        else:
+            apps.extend(raw_apps)
+            processed_list.extend([None] * len(apps))
+            for index, app in enumerate(apps):
+                notify("research", index, dict(app))
+            tasks.extend(asyncio.ensure_future(first_pass(index, app)) for index, app in enumerate(apps))
+        await asyncio.gather(*tasks)
+
+        # 2. One batched Gemini lookup for everything search could not find
+        if needs_ai:
+            needs_ai.sort()
+            with metrics.stage("ai_resolve"):
+                ai_ids = await find_ids_via_gemini(client, [apps[i].get('name') for i in needs_ai], model_name)
+            tasks = [asyncio.ensure_future(second_pass(i, ai_ids.get(apps[i].get('name')))) for i in needs_ai]
+            await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def process_results(raw_apps, region, resolve_with_ai, client, model_name, category="", max_concurrency=None,
+                          deadline=None):
+    """
+    Async scraper_logic.process_results: same chain and batched AI step, same output order.
+    At most max_concurrency apps (default PROCESS_MAX_WORKERS) are in flight per call.
+    raw_apps may be an async iterator (iter_market_research): apps are verified as they arrive.
+    deadline (from deadlines.after) bounds the whole call and every outbound request in it: work
+    still running then is cancelled and its apps are returned with status PENDING.
+    """
+    bounded = _per_request_limit(max_concurrency)
+
+    apps = []
+    processed_list = []
+    with metrics.stage("process_results"), deadlines.scope(deadline):
+        try:
+            await asyncio.wait_for(
+                _process(raw_apps, apps, processed_list, region, resolve_with_ai, client, model_name, category, bounded),
+                deadlines.remaining()
+            )
+        except asyncio.TimeoutError:
+            pending = processed_list.count(None)
+            print(f"⏱️ Deadline reached with {pending} of {len(apps)} app(s) still pending.")
+            metrics.RESOLVE_PATHS.inc(pending, path="deadline", status=scraper_logic.status_label(scraper_logic.PENDING))
+    return [
+        app if app is not None else scraper_logic.finish_app(raw_app, raw_app.get('package'), None, region,
+                                                             category=category, status=scraper_logic.PENDING)
+        for raw_app, app in zip(apps, processed_list)
+    ]
+
+
+async def iter_process_events(raw_apps, region, resolve_with_ai, client, model_name, category="", max_concurrency=None,
+                              deadline=None):
+    """
+    process_results that also reports progress: yields ("research", index, raw_app) when an app is taken
+    from raw_apps (a list or an async iterator such as iter_market_research) and ("app", index, app)
+    when it is done, in completion order. Apps that need Gemini come last, after one batched lookup.
+    At the deadline (as in process_results) the work still running is cancelled and every app
+    without a result is yielded with status PENDING.
+    Closing the generator early cancels the work still running.
+    """
+    bounded = _per_request_limit(max_concurrency)
+
+    apps = []
+    processed_list = []
+    events = asyncio.Queue()
+    finished = object()
+
+    async def run():
+        try:
+            await _process(raw_apps, apps, processed_list, region, resolve_with_ai, client, model_name, category,
+                           bounded, on_event=lambda kind, index, app: events.put_nowait((kind, index, app)))
+        finally:
+            events.put_nowait(finished)
+
+    def time_left():
+        return None if deadline is None else max(0.0, deadline - time.monotonic())
+
+    with metrics.stage("process_results"):
+        # The task copies the context, so its outbound calls see the deadline; the scope is left
+        # before the first yield so it never leaks into the consumer between events
+        with deadlines.scope(deadline) as deadline:
+            task = asyncio.ensure_future(run())
+        try:
+            while True:
+                try:
+                    event = await asyncio.wait_for(events.get(), time_left())
+                except asyncio.TimeoutError:
+                    task.cancel()
+                    # Results that made it into the queue before the deadline still count
+                    while not events.empty():
+                        event = events.get_nowait()
+                        if event is not finished:
+                            yield event
+                    break
+                if event is finished:
+                    await task # re-raises a failure of the pipeline
+                    break
+                yield event
+        finally:
+            task.cancel()
+
+    pending = [index for index, app in enumerate(processed_list) if app is None]
+    if pending:
+        print(f"⏱️ Deadline reached with {len(pending)} of {len(apps)} app(s) still pending.")
+        metrics.RESOLVE_PATHS.inc(len(pending), path="deadline", status=scraper_logic.status_label(scraper_logic.PENDING))
+    for index in pending:
+        raw_app = apps[index]
+        yield "app", index, scraper_logic.finish_app(raw_app, raw_app.get('package'), None, region,
+                                                     category=category, status=scraper_logic.PENDING)
@@ -0,0 +1,236 @@
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+import scraper_logic
+
+# Background batch searches over many (topic, region) pairs.
+# Pairs from every job share one bounded worker pool; calls toward Gemini and toward
+# play.google.com are capped separately by process-wide semaphores.
+
+BATCH_MAX_WORKERS = int(os.environ.get("BATCH_MAX_WORKERS", "4"))
+BATCH_GEMINI_CONCURRENCY = int(os.environ.get("BATCH_GEMINI_CONCURRENCY", "2"))
+BATCH_PLAY_CONCURRENCY = int(os.environ.get("BATCH_PLAY_CONCURRENCY", "16"))
+BATCH_MAX_JOBS = int(os.environ.get("BATCH_MAX_JOBS", "100"))
+
+_executor = ThreadPoolExecutor(max_workers=BATCH_MAX_WORKERS, thread_name_prefix="batch")
+_gemini_semaphore = threading.BoundedSemaphore(BATCH_GEMINI_CONCURRENCY)
+_play_semaphore = threading.BoundedSemaphore(BATCH_PLAY_CONCURRENCY)
+
+_jobs_lock = threading.Lock()
+_jobs = {}  # job_id -> BatchJob, insertion ordered
+
+
+class BatchUpstream:
+    """
+    Upstream for process_results that dedupes identical calls across a whole batch.
+    Concurrent callers with the same key wait for the first call instead of repeating it.
+    Answers are reused for the rest of the job, except transient ones (Unknown status,
+    empty search, unresolved name, errors): those are only shared with callers already
+    waiting, and the next caller asks again.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.upstream_calls = 0
+        self.deduped_calls = 0
+
+    def _forget(self, key, future):
+        with self._lock:
+            if self._calls.get(key) is future:
+                del self._calls[key]
+
+    def _call_once(self, key, semaphore, fn, keep):
+        with self._lock:
+            future = self._calls.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._calls[key] = future
+                self.upstream_calls += 1
+            else:
+                self.deduped_calls += 1
+        if owner:
+            try:
+                with semaphore:
+                    result = fn()
+            except Exception as e:
+                self._forget(key, future)
+                future.set_exception(e)
+            else:
+                if not keep(result):
+                    self._forget(key, future)
+                future.set_result(result)
+        return future.result()
+
+    def verify_package_status(self, package_name, region="US", **kwargs):
+        return self._call_once(
+            ("verify", package_name, region, tuple(sorted(kwargs.items()))),
+            _play_semaphore,
+            lambda: scraper_logic.verify_package_status(package_name, region=region, **kwargs),
+            lambda result: result[0] != scraper_logic.UNKNOWN,
+        )
+
+    def verify_package_exists(self, package_name, region="US", **kwargs):
+        return self.verify_package_status(package_name, region=region, **kwargs)[1]
+
+    def get_package_by_name(self, query, region="US", **kwargs):
+        result = self._call_once(
+            ("search", query, region, tuple(sorted(kwargs.items()))),
+            _play_semaphore,
+            lambda: scraper_logic.get_package_by_name(query, region=region, **kwargs),
+            bool,
+        )
+        return list(result)
+
+    def find_ids_via_gemini(self, client, app_names, model_name):
+        # Names already resolved (or in flight) anywhere in the batch are reused;
+        # the rest go to Gemini together in one batched call.
+        futures = {}
+        owned = []
+        with self._lock:
+            for name in dict.fromkeys(app_names):
+                key = ("ai", name, model_name)
+                future = self._calls.get(key)
+                if future is None:
+                    future = Future()
+                    self._calls[key] = future
+                    owned.append(name)
+                else:
+                    self.deduped_calls += 1
+                futures[name] = future
+            if owned:
+                self.upstream_calls += 1
+        if owned:
+            try:
+                with _gemini_semaphore:
+                    resolved = scraper_logic.find_ids_via_gemini(client, owned, model_name)
+            except Exception as e:
+                for name in owned:
+                    self._forget(("ai", name, model_name), futures[name])
+                    futures[name].set_exception(e)
+            else:
+                for name in owned:
+                    if resolved.get(name) is None:
+                        self._forget(("ai", name, model_name), futures[name])
+                    futures[name].set_result(resolved.get(name))
+        return {name: future.result() for name, future in futures.items()}
+
+    def get_stats(self):
+        with self._lock:
+            return {"upstream_calls": self.upstream_calls, "deduped_calls": self.deduped_calls}
+
+
+class BatchJob:
+    def __init__(self, pairs, resolve_with_ai, client, model_name, refresh=False):
+        self.job_id = uuid.uuid4().hex
+        self.created_at = time.time()
+        self.finished_at = None
+        self.resolve_with_ai = resolve_with_ai
+        self.client = client
+        self.model_name = model_name
+        self.refresh = refresh
+        self.upstream = BatchUpstream()
+        self.lock = threading.Lock()
+        self.pairs = [
+            {
+                "topic": topic,
+                "region": region,
+                "region_code": scraper_logic.translate_country_to_code(region),
+                "status": "queued",
+                "count": 0,
+                "verified": 0,
+                "error": None,
+                "data": None,
+            }
+            for topic, region in pairs
+        ]
+
+    @property
+    def status(self):
+        states = {p["status"] for p in self.pairs}
+        if states <= {"done", "failed"}:
+            return "done"
+        if states == {"queued"}:
+            return "queued"
+        return "running"
+
+    def summary(self):
+        with self.lock:
+            pairs = [{k: v for k, v in p.items() if k != "data"} for p in self.pairs]
+            finished = sum(1 for p in self.pairs if p["status"] in ("done", "failed"))
+            status = self.status
+        return {
+            "job_id": self.job_id,
+            "status": status,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+            "progress": {"finished": finished, "total": len(pairs)},
+            "dedup": self.upstream.get_stats(),
+            "pairs": [dict(p, index=i) for i, p in enumerate(pairs)],
+        }
+
+    def pair_result(self, index):
+        with self.lock:
+            pair = self.pairs[index]
+            return {k: v for k, v in pair.items()}
+
+    def _set(self, index, **fields):
+        with self.lock:
+            self.pairs[index].update(fields)
+            if self.status == "done" and self.finished_at is None:
+                self.finished_at = time.time()
+
+    def run_pair(self, index):
+        pair = self.pairs[index]
+        topic, region_code = pair["topic"], pair["region_code"]
+        self._set(index, status="running")
+        try:
+            print(f" Batch {self.job_id[:8]}: {topic} / {region_code}")
+            with _gemini_semaphore:
+                raw_results, _ = scraper_logic.get_market_research_cached(
+                    topic, region_code, self.client, self.model_name, refresh=self.refresh
+                )
+            final_results = scraper_logic.process_results(
+                raw_results,
+                region_code,
+                self.resolve_with_ai,
+                self.client,
+                self.model_name,
+                category=topic,
+                upstream=self.upstream,
+            )
+            verified = sum(1 for a in final_results if a.get("status") == "Verified")
+            self._set(index, status="done", count=len(final_results), verified=verified, data=final_results)
+        except Exception as e:
+            print(f"Batch Pair Error ({topic} / {region_code}): {e}")
+            self._set(index, status="failed", error=str(e))
+
+
+def submit(pairs, resolve_with_ai, client, model_name, refresh=False):
+    """
+    Queues a batch job for a list of (topic, region) pairs and returns it immediately.
+    """
+    job = BatchJob(pairs, resolve_with_ai, client, model_name, refresh=refresh)
+    with _jobs_lock:
+        _jobs[job.job_id] = job
+        _prune_jobs()
+    for index in range(len(job.pairs)):
+        _executor.submit(job.run_pair, index)
+    return job
+
+
+def _prune_jobs():
+    # Drop the oldest finished jobs once more than BATCH_MAX_JOBS are kept
+    excess = len(_jobs) - BATCH_MAX_JOBS
+    if excess <= 0:
+        return
+    for job_id in [j.job_id for j in _jobs.values() if j.status == "done"][:excess]:
+        del _jobs[job_id]
+
+
+def get_job(job_id):
+    with _jobs_lock:
+        return _jobs.get(job_id)
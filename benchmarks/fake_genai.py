@@ -0,0 +1,127 @@
+import asyncio
+import json
+import re
+import time
+
+# Offline stand-in for google.genai.Client, covering the calls scraper_logic makes:
+# client.models.generate_content(...) / client.aio.models.generate_content(...) for market research and
+# package resolution, their generate_content_stream variants, and client.models.list().
+# Streamed answers arrive in stream_chunks pieces spread evenly over the latency.
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeModel:
+    def __init__(self, name):
+        self.name = name
+        self.supported_methods = ["generateContent"]
+
+
+class FakeModels:
+    def __init__(self, client):
+        self._client = client
+
+    def generate_content(self, model, contents, config=None):
+        client = self._client
+        client.calls += 1
+        time.sleep(client.latency)
+        if "Market Researcher" in contents:
+            return FakeResponse(client.research_text(contents))
+        return FakeResponse(client.resolve_text(contents))
+
+    def generate_content_stream(self, model, contents, config=None):
+        client = self._client
+        client.calls += 1
+        pieces = client.stream_pieces(contents)
+        for piece in pieces:
+            time.sleep(client.latency / len(pieces))
+            yield FakeResponse(piece)
+
+    def list(self):
+        time.sleep(self._client.latency)
+        return [FakeModel(f"models/fake-model-{i}") for i in range(20)]
+
+
+class FakeAsyncModels:
+    def __init__(self, client):
+        self._client = client
+
+    async def generate_content(self, model, contents, config=None):
+        client = self._client
+        client.calls += 1
+        await asyncio.sleep(client.latency)
+        if "Market Researcher" in contents:
+            return FakeResponse(client.research_text(contents))
+        return FakeResponse(client.resolve_text(contents))
+
+    async def generate_content_stream(self, model, contents, config=None):
+        client = self._client
+        client.calls += 1
+        pieces = client.stream_pieces(contents)
+
+        async def chunks():
+            for piece in pieces:
+                await asyncio.sleep(client.latency / len(pieces))
+                yield FakeResponse(piece)
+        return chunks()
+
+
+class FakeAio:
+    def __init__(self, client):
+        self.models = FakeAsyncModels(client)
+
+
+class FakeGenaiClient:
+    """
+    research_size apps per market research call; missing_rate of them carry a package that the
+    Play Store stub answers with 404 ("missing.*"), which forces the search fallback path.
+    Half of those are named "Unlisted ..." so the stub search finds nothing and the Gemini path runs.
+    """
+
+    def __init__(self, research_size=30, missing_rate=0.2, latency=0.0, fenced=True, stream_chunks=20):
+        self.research_size = research_size
+        self.missing_rate = missing_rate
+        self.latency = latency
+        self.fenced = fenced
+        self.stream_chunks = stream_chunks
+        self.calls = 0
+        self.models = FakeModels(self)
+        self.aio = FakeAio(self)
+
+    def _wrap(self, payload):
+        text = json.dumps(payload)
+        return f"```json\n{text}\n```" if self.fenced else text
+
+    def research_apps(self, topic=""):
+        slug = re.sub(r"[^a-z0-9]+", "", topic.lower()) or "topic"
+        missing_every = int(round(1 / self.missing_rate)) if self.missing_rate else 0
+        apps = []
+        for i in range(self.research_size):
+            missing = missing_every and i % missing_every == missing_every - 1
+            prefix = "missing" if missing else "com.stub"
+            # Every other missing app is also unknown to Play Store search, so only Gemini can resolve it
+            unlisted = missing and (i // missing_every) % 2 == 1
+            name = f"Unlisted {topic} App {i}" if unlisted else f"{topic} App {i}"
+            apps.append({"package": f"{prefix}.{slug}{i}", "name": name, "weight": 1.0})
+        return apps
+
+    def stream_pieces(self, prompt):
+        text = self.research_text(prompt) if "Market Researcher" in prompt else self.resolve_text(prompt)
+        size = max(1, -(-len(text) // max(1, self.stream_chunks)))
+        return [text[i:i + size] for i in range(0, len(text), size)]
+
+    def research_text(self, prompt):
+        match = re.search(r"relevant Android applications used '([^']*)'", prompt)
+        return self._wrap(self.research_apps(match.group(1) if match else ""))
+
+    def resolve_text(self, prompt):
+        names = []
+        for line in prompt.splitlines():
+            line = line.strip()
+            if line.startswith("["):
+                names = json.loads(line)
+                break
+        return self._wrap({name: f"com.stub.{re.sub(r'[^a-z0-9]+', '', name.lower())}" for name in names})
@@ -0,0 +1,400 @@
+"""
+End-to-end load test for the FastAPI service (Main.app).
+
+Main.app is served in-process by uvicorn on a local port. Play Store traffic goes to the local stub
+(benchmarks/play_store_stub.py) and Gemini is replaced by benchmarks/fake_genai.py, both with
+configurable latency, so runs need no network or API key. A weighted mix of /api/search,
+/api/search/stream (read to the end), /api/verify and /api/export-binary requests is driven by N
+concurrent clients (closed loop) at each concurrency level; every level reports throughput,
+p50 / p95 / p99 latency per endpoint and how saturated the server's thread pool and event loop were. The first level whose p95 exceeds
+--degrade-factor x the first level's p95 (or whose error rate exceeds --max-error-rate) is
+reported as degraded. The stub and the load generator share the process (and the GIL) with the
+service, so absolute numbers are conservative; compare runs made on the same machine.
+
+    python benchmarks/load_test.py
+    python benchmarks/load_test.py --concurrency 1,8,32,128 --duration 20 --mix search=1,stream=1,verify=8,export=1
+    python benchmarks/load_test.py --latency 0.2 --gemini-latency 2 --threadpool-size 80 --output load.json
+    python benchmarks/load_test.py --compare benchmarks/results/load-<commit>.json
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import platform
+import random
+import socket
+import sys
+import threading
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# Keep the service's persistent stores out of the way: no catalog, in-memory research cache
+os.environ.setdefault("CATALOG_ENABLED", "0")
+os.environ.setdefault("RESEARCH_CACHE_DIR", "")
+os.chdir(REPO_ROOT)  # Main mounts static/ relative to the working directory
+
+import anyio.to_thread
+import httpx
+import uvicorn
+import genai_clients
+import Main
+import play_transport
+import verify_cache
+from fake_genai import FakeGenaiClient
+from play_store_stub import PlayStoreStub
+from run_benchmarks import git_commit, make_payload
+
+ENDPOINTS = ("search", "stream", "verify", "export")
+
+
+def percentile(ordered, fraction):
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def latency_summary(samples):
+    ordered = sorted(samples)
+    return {
+        "p50_s": round(percentile(ordered, 0.50), 6) if ordered else None,
+        "p95_s": round(percentile(ordered, 0.95), 6) if ordered else None,
+        "p99_s": round(percentile(ordered, 0.99), 6) if ordered else None,
+        "max_s": round(ordered[-1], 6) if ordered else None,
+    }
+
+
+class InProcessServer:
+    """
+    Serves an ASGI app with uvicorn on a background thread (own event loop) and samples, on that
+    loop, the Starlette / anyio thread limiter (sync endpoints, run_in_threadpool), the loop's
+    default executor (asyncio.to_thread) and event loop lag.
+    """
+
+    def __init__(self, app, threadpool_size=None, sample_interval=0.05):
+        self.app = app
+        self.threadpool_size = threadpool_size
+        self.sample_interval = sample_interval
+        self.samples = []
+        self._socket = None
+        self._server = None
+        self._loop = None
+        self._thread = None
+        self._sampler = None
+
+    @property
+    def base_url(self):
+        host, port = self._socket.getsockname()[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._socket.bind(("127.0.0.1", 0))
+        config = uvicorn.Config(self.app, log_level="warning", access_log=False, lifespan="on")
+        self._server = uvicorn.Server(config)
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_until_complete,
+                                        args=(self._server.serve(sockets=[self._socket]),),
+                                        name="load-test-server", daemon=True)
+        self._thread.start()
+        while not self._server.started:
+            if not self._thread.is_alive():
+                raise RuntimeError("Server failed to start")
+            time.sleep(0.01)
+        self._sampler = asyncio.run_coroutine_threadsafe(self._sample(), self._loop)
+        return self
+
+    def stop(self):
+        if self._sampler is not None:
+            self._loop.call_soon_threadsafe(self._sampler.cancel)
+        if self._server is not None:
+            self._server.should_exit = True
+            self._thread.join(10)
+            self._socket.close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    async def _sample(self):
+        limiter = anyio.to_thread.current_default_thread_limiter()
+        if self.threadpool_size:
+            limiter.total_tokens = self.threadpool_size
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.sample_interval)
+            executor = getattr(loop, "_default_executor", None)
+            self.samples.append({
+                "loop_lag_s": max(0.0, loop.time() - started - self.sample_interval),
+                "threadpool_busy": limiter.borrowed_tokens,
+                "threadpool_size": limiter.total_tokens,
+                "threadpool_waiting": limiter.statistics().tasks_waiting,
+                "executor_queue": executor._work_queue.qsize() if executor is not None else 0,
+            })
+
+    def take_samples(self):
+        samples, self.samples = self.samples, []
+        return samples
+
+
+def saturation_summary(samples):
+    if not samples:
+        return {}
+    busy = [s["threadpool_busy"] for s in samples]
+    lags = sorted(s["loop_lag_s"] for s in samples)
+    size = samples[-1]["threadpool_size"]
+    return {
+        "threadpool_size": size,
+        "threadpool_busy_mean": round(sum(busy) / len(busy), 2),
+        "threadpool_busy_max": max(busy),
+        "threadpool_saturated_ratio": round(sum(1 for b in busy if b >= size) / len(busy), 3),
+        "threadpool_waiting_max": max(s["threadpool_waiting"] for s in samples),
+        "executor_queue_max": max(s["executor_queue"] for s in samples),
+        "loop_lag_p99_s": round(percentile(lags, 0.99), 6),
+        "loop_lag_max_s": round(lags[-1], 6),
+    }
+
+
+class Workload:
+    """Builds the requests of the mix; one instance per run, seeded for repeatability."""
+
+    def __init__(self, args):
+        self.args = args
+        self.random = random.Random(args.seed)
+        self.weights = [args.mix.get(name, 0) for name in ENDPOINTS]
+        self.export_body = json.dumps(make_payload(args.export_bytes)).encode("utf-8")
+        self.counter = 0
+
+    def pick(self):
+        return self.random.choices(ENDPOINTS, weights=self.weights)[0]
+
+    async def send(self, client, endpoint):
+        self.counter += 1
+        n = self.counter
+        if endpoint in ("search", "stream"):
+            topic = f"Load Topic {self.random.randrange(self.args.search_topics)}"
+            path = "/api/search" if endpoint == "search" else "/api/search/stream"
+            return await client.post(path, json={
+                "topic": topic, "region": "US", "api_key": "load-test", "model_name": "fake-model",
+                "resolve_pkg_with_ai": self.args.resolve_with_ai, "refresh": not self.args.research_cache,
+                "use_catalog": False,
+            })
+        if endpoint == "verify":
+            missing = self.random.random() < self.args.missing_rate
+            package = f"missing.load{n}" if missing else f"com.stub.load{n}"
+            return await client.get("/api/verify", params={"package_name": package, "app_name": f"Load App {n}",
+                                                            "region": "US"})
+        return await client.post("/api/export-binary", content=self.export_body,
+                                 headers={"Content-Type": "application/json"})
+
+    @staticmethod
+    def succeeded(endpoint, response):
+        if response.status_code != 200:
+            return False
+        if endpoint == "stream":
+            # Failures after the stream started still answer 200, with an "error" event last
+            lines = response.text.splitlines()
+            return bool(lines) and json.loads(lines[-1]).get("event") == "done"
+        return True
+
+
+async def run_level(base_url, workload, concurrency, duration):
+    """Closed loop: concurrency clients send back-to-back requests for duration seconds."""
+    records = []  # (endpoint, seconds, ok)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=None) as client:
+        stop_at = time.perf_counter() + duration
+
+        async def user():
+            while time.perf_counter() < stop_at:
+                endpoint = workload.pick()
+                started = time.perf_counter()
+                try:
+                    response = await workload.send(client, endpoint)
+                    ok = workload.succeeded(endpoint, response)
+                except httpx.HTTPError:
+                    ok = False
+                records.append((endpoint, time.perf_counter() - started, ok))
+
+        started = time.perf_counter()
+        await asyncio.gather(*(user() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    return records, elapsed
+
+
+def level_result(concurrency, records, elapsed, samples):
+    entry = {"concurrency": concurrency, "elapsed_s": round(elapsed, 3), "endpoints": {}}
+    for endpoint in ("all",) + ENDPOINTS:
+        selected = [r for r in records if endpoint == "all" or r[0] == endpoint]
+        if not selected:
+            continue
+        stats = {
+            "requests": len(selected),
+            "errors": sum(1 for r in selected if not r[2]),
+            "throughput_rps": round(len(selected) / elapsed, 2) if elapsed else None,
+        }
+        stats.update(latency_summary([r[1] for r in selected]))
+        entry["endpoints"][endpoint] = stats
+    entry["saturation"] = saturation_summary(samples)
+    return entry
+
+
+def print_level(entry):
+    for endpoint, stats in entry["endpoints"].items():
+        print(f"{entry['concurrency']:>5} {endpoint:<8} {stats['requests']:>7} {stats['errors']:>6} "
+              f"{stats['throughput_rps']:>9.1f} {stats['p50_s'] * 1000:>9.1f} {stats['p95_s'] * 1000:>9.1f} "
+              f"{stats['p99_s'] * 1000:>9.1f}")
+    sat = entry["saturation"]
+    if sat:
+        print(f"      threadpool busy mean {sat['threadpool_busy_mean']} / max {sat['threadpool_busy_max']} "
+              f"of {sat['threadpool_size']} (saturated {sat['threadpool_saturated_ratio']:.0%}, "
+              f"waiting max {sat['threadpool_waiting_max']}), executor queue max {sat['executor_queue_max']}, "
+              f"loop lag p99 {sat['loop_lag_p99_s'] * 1000:.1f} ms")
+
+
+def find_degradation(levels, degrade_factor, max_error_rate):
+    """(last healthy concurrency, first degraded concurrency or None, reason)."""
+    if not levels:
+        return None, None, None
+    base_p95 = levels[0]["endpoints"]["all"]["p95_s"]
+    healthy = None
+    for entry in levels:
+        total = entry["endpoints"]["all"]
+        error_rate = total["errors"] / total["requests"] if total["requests"] else 0.0
+        if error_rate > max_error_rate:
+            return healthy, entry["concurrency"], f"error rate {error_rate:.1%}"
+        if base_p95 and total["p95_s"] > degrade_factor * base_p95:
+            return healthy, entry["concurrency"], f"p95 {total['p95_s'] * 1000:.0f} ms > {degrade_factor}x {base_p95 * 1000:.0f} ms"
+        healthy = entry["concurrency"]
+    return healthy, None, None
+
+
+def compare(levels, baseline_path):
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    old = {(b["concurrency"], name): stats for b in baseline.get("levels", []) for name, stats in b["endpoints"].items()}
+    print(f"\nComparison against {baseline_path} (commit {baseline.get('meta', {}).get('commit')}):")
+    for entry in levels:
+        for name, stats in entry["endpoints"].items():
+            before = old.get((entry["concurrency"], name))
+            if not before or not before["p95_s"] or not before["throughput_rps"]:
+                continue
+            ratio = stats["p95_s"] / before["p95_s"]
+            rps_ratio = stats["throughput_rps"] / before["throughput_rps"]
+            flag = "  << regression" if ratio > 1.2 or rps_ratio < 0.8 else ""
+            print(f"{entry['concurrency']:>5} {name:<8} p95 {before['p95_s'] * 1000:9.1f} -> {stats['p95_s'] * 1000:9.1f} ms  "
+                  f"rps {before['throughput_rps']:8.1f} -> {stats['throughput_rps']:8.1f}{flag}")
+
+
+def parse_ints(text):
+    return [int(x) for x in text.split(",") if x.strip()]
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in ENDPOINTS:
+            raise argparse.ArgumentTypeError(f"Unknown endpoint {name!r} (expected {', '.join(ENDPOINTS)})")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=parse_ints, default=[1, 4, 16, 64], help="client concurrency levels")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per concurrency level")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("search=1,stream=1,verify=8,export=1"),
+                        help="endpoint weights, e.g. search=1,stream=1,verify=8,export=1")
+    parser.add_argument("--latency", type=float, default=0.05, help="Play Store stub latency per request (s)")
+    parser.add_argument("--jitter", type=float, default=0.01, help="+/- latency jitter (s)")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="fraction of stub requests answered with 429")
+    parser.add_argument("--detail-page-bytes", type=int, default=300_000, help="size of the stub details page")
+    parser.add_argument("--gemini-latency", type=float, default=0.5, help="fake Gemini latency per call (s)")
+    parser.add_argument("--research-size", type=int, default=20, help="apps per fake market research answer")
+    parser.add_argument("--missing-rate", type=float, default=0.2, help="fraction of packages that 404")
+    parser.add_argument("--resolve-with-ai", action="store_true", help="search requests resolve misses with Gemini")
+    parser.add_argument("--research-cache", action="store_true",
+                        help="let searches hit the research cache (default: every search asks Gemini)")
+    parser.add_argument("--search-topics", type=int, default=50, help="distinct search topics")
+    parser.add_argument("--export-bytes", type=int, default=100_000, help="size of the /api/export-binary JSON body")
+    parser.add_argument("--with-cache", action="store_true", help="keep the verification cache enabled")
+    parser.add_argument("--play-rate", type=float, default=None,
+                        help="Play Store requests / s per host (default PLAY_RATE_LIMIT)")
+    parser.add_argument("--threadpool-size", type=int, default=None,
+                        help="server thread limiter size (default anyio's 40)")
+    parser.add_argument("--degrade-factor", type=float, default=2.0)
+    parser.add_argument("--max-error-rate", type=float, default=0.01)
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--output", default=None, help="results JSON path (default benchmarks/results/load-<commit>.json)")
+    parser.add_argument("--compare", default=None, help="baseline results JSON to compare against")
+    parser.add_argument("--verbose", action="store_true", help="do not mute the service's output")
+    args = parser.parse_args(argv)
+
+    if not args.with_cache:
+        verify_cache.VERIFY_CACHE_ENABLED = False
+    if args.play_rate:
+        play_transport.PLAY_RATE_LIMIT = args.play_rate
+    fake = FakeGenaiClient(research_size=args.research_size, missing_rate=args.missing_rate,
+                           latency=args.gemini_latency)
+    genai_clients.get_client = lambda api_key: fake
+
+    levels = []
+    stub = PlayStoreStub(latency=args.latency, jitter=args.jitter, rate_429=args.rate_429,
+                         detail_page_bytes=args.detail_page_bytes, seed=args.seed)
+    with stub, InProcessServer(Main.app, threadpool_size=args.threadpool_size) as server:
+        play_transport.PLAY_STORE_BASE_URL = stub.base_url
+        print(f"{'conc':>5} {'endpoint':<8} {'reqs':>7} {'errors':>6} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+        for concurrency in args.concurrency:
+            workload = Workload(args)
+            server.take_samples()
+            with open(os.devnull, "w") as devnull:
+                with contextlib.redirect_stdout(devnull) if not args.verbose else contextlib.nullcontext():
+                    records, elapsed = asyncio.run(run_level(server.base_url, workload, concurrency, args.duration))
+            entry = level_result(concurrency, records, elapsed, server.take_samples())
+            levels.append(entry)
+            print_level(entry)
+
+    healthy, degraded, reason = find_degradation(levels, args.degrade_factor, args.max_error_rate)
+    if degraded is None:
+        print(f"\nNo degradation up to concurrency {healthy}.")
+    else:
+        print(f"\nLatency degrades at concurrency {degraded} ({reason}); last healthy level: {healthy}.")
+
+    commit = git_commit()
+    report = {
+        "meta": {
+            "commit": commit,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "config": {k: v for k, v in vars(args).items() if k not in ("output", "compare")},
+            "transport": play_transport.get_stats(),
+            "upstream": dict(stub.stats),
+            "gemini_calls": fake.calls,
+        },
+        "levels": levels,
+        "sustainable_concurrency": healthy,
+        "degraded_at": degraded,
+    }
+    output = args.output or os.path.join(REPO_ROOT, "benchmarks", "results", f"load-{commit or 'local'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Saved results to {output}")
+
+    if args.compare:
+        compare(levels, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# Local stand-in for play.google.com used by the benchmarks.
+# /store/apps/details?id=...  200 with a padded HTML page, or 404 for packages starting with "missing."
+# /store/search?q=...         200 with a results page linking to com.stub.<query slug> packages
+#                             (no results for queries containing "unlisted")
+# Every response waits latency +/- jitter seconds; rate_429 of requests answer 429 instead.
+# HEAD answers like GET without the body, or with head_status (e.g. 405) when that is set.
+
+PAD_LINE = '<div class="stub-padding">' + "Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * 4 + "</div>\n"
+
+
+def slugify(text):
+    return re.sub(r"[^a-z0-9]+", "", text.lower()) or "app"
+
+
+class PlayStoreStub:
+    def __init__(self, latency=0.05, jitter=0.0, rate_429=0.0, rate_404=0.0,
+                 detail_page_bytes=300_000, search_hits=30, head_status=None, seed=1234):
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_429 = rate_429
+        self.rate_404 = rate_404
+        self.detail_page_bytes = detail_page_bytes
+        self.search_hits = search_hits
+        self.head_status = head_status
+        self._random = random.Random(seed)
+        self._random_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.stats = {"requests": 0, "details": 0, "searches": 0, "status_404": 0, "status_429": 0, "heads": 0, "bytes_sent": 0}
+        self._server = None
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _roll(self):
+        with self._random_lock:
+            return self._random.random(), self._random.uniform(-self.jitter, self.jitter)
+
+    def _count(self, **deltas):
+        with self._stats_lock:
+            for name, delta in deltas.items():
+                self.stats[name] += delta
+
+    def detail_page(self, package_name):
+        head = f"<html><head><title>{package_name} - Apps on Google Play</title></head><body>\n"
+        head += f'<a href="/store/apps/details?id={package_name}">{package_name}</a>\n'
+        padding = PAD_LINE * max(0, self.detail_page_bytes // len(PAD_LINE))
+        return (head + padding + "</body></html>").encode("utf-8")
+
+    def search_page(self, query):
+        if "unlisted" in query.lower():
+            return b"<html><body>No results</body></html>"
+        slug = slugify(query)
+        links = "".join(
+            f'<div class="result"><a href="/store/apps/details?id=com.stub.{slug}{"" if i == 0 else i}">'
+            f"{query} {i}</a></div>\n" + PAD_LINE * 20
+            for i in range(self.search_hits)
+        )
+        return f"<html><body>\n{links}</body></html>".encode("utf-8")
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                roll, jitter = stub._roll()
+                time.sleep(max(0.0, stub.latency + jitter))
+                parsed = urlparse(self.path)
+                query = parse_qs(parsed.query)
+                stub._count(requests=1)
+
+                if roll < stub.rate_429:
+                    stub._count(status_429=1)
+                    return self._send(429, b"Too Many Requests", {"Retry-After": "1"})
+
+                if parsed.path == "/store/apps/details":
+                    stub._count(details=1)
+                    package_name = query.get("id", [""])[0]
+                    if not package_name or package_name.startswith("missing.") or roll < stub.rate_429 + stub.rate_404:
+                        stub._count(status_404=1)
+                        return self._send(404, b"<html><body>Not Found</body></html>")
+                    return self._send(200, stub.detail_page(package_name))
+
+                if parsed.path == "/store/search":
+                    stub._count(searches=1)
+                    return self._send(200, stub.search_page(query.get("q", [""])[0]))
+
+                return self._send(404, b"Not Found")
+
+            def handle(self):
+                try:
+                    super().handle()
+                except (BrokenPipeError, ConnectionResetError):
+                    pass # client dropped a kept-alive connection after reading only part of a page
+
+            def do_HEAD(self):
+                stub._count(heads=1)
+                if stub.head_status is not None:
+                    stub._count(requests=1)
+                    return self._send(stub.head_status, b"")
+                self.do_GET()
+
+            def _send(self, status, body, headers=None):
+                self.send_response(status)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                if self.command != "HEAD":
+                    try:
+                        self.wfile.write(body)
+                        stub._count(bytes_sent=len(body))
+                    except (BrokenPipeError, ConnectionResetError):
+                        # Client closed early (e.g. an existence probe that only needed the status)
+                        self.close_connection = True
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self, host="127.0.0.1", port=0):
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name="play-store-stub", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def reset_stats(self):
+        with self._stats_lock:
+            for name in self.stats:
+                self.stats[name] = 0
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
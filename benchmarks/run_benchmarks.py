@@ -0,0 +1,235 @@
+"""
+Offline benchmarks for scraper_logic and ConfigExport.
+
+Play Store traffic goes to a local stub (benchmarks/play_store_stub.py) and Gemini is replaced by
+benchmarks/fake_genai.py, so runs are repeatable and need no network or API key.
+
+    python benchmarks/run_benchmarks.py
+    python benchmarks/run_benchmarks.py --latency 0.1 --rate-429 0.05 --output before.json
+    python benchmarks/run_benchmarks.py --compare before.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import ConfigExport
+import encode_cache
+import play_transport
+import scraper_logic
+import verify_cache
+from fake_genai import FakeGenaiClient
+from play_store_stub import PlayStoreStub
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, text=True).strip()
+    except Exception:
+        return None
+
+
+def summarize(samples):
+    ordered = sorted(samples)
+    return {
+        "runs": len(samples),
+        "mean_s": round(statistics.mean(samples), 6),
+        "median_s": round(statistics.median(samples), 6),
+        "p95_s": round(ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))], 6),
+        "min_s": round(ordered[0], 6),
+        "max_s": round(ordered[-1], 6),
+    }
+
+
+def measure(fn, repeat, quiet=True):
+    """Runs fn() repeat times, returns (durations, last result). scraper_logic's prints are muted when quiet."""
+    durations = []
+    result = None
+    for _ in range(repeat):
+        sink = io.StringIO() if quiet else None
+        with contextlib.redirect_stdout(sink) if quiet else contextlib.nullcontext():
+            started = time.perf_counter()
+            result = fn()
+            durations.append(time.perf_counter() - started)
+    return durations, result
+
+
+def run_benchmark(results, stub, name, params, fn, repeat, quiet, per_call=1):
+    stub.reset_stats()
+    bytes_before = play_transport.get_stats()["bytes_received"]
+    durations, result = measure(fn, repeat, quiet)
+    bytes_received = play_transport.get_stats()["bytes_received"] - bytes_before
+    entry = {"name": name, "params": params}
+    entry.update(summarize(durations))
+    if per_call > 1:
+        entry["per_call_median_s"] = round(entry["median_s"] / per_call, 6)
+    # Body bytes the client actually read, per fn() call and per individual call inside it
+    entry["bytes_received"] = bytes_received // repeat
+    entry["bytes_per_call"] = bytes_received // (repeat * per_call)
+    entry["upstream"] = dict(stub.stats)
+    # Body bytes the stub wrote, including what a streamed probe left unread and dropped
+    entry["bytes_sent_per_call"] = stub.stats["bytes_sent"] // (repeat * per_call)
+    results.append(entry)
+    print(f"{name:<28} {json.dumps(params):<40} median {entry['median_s'] * 1000:9.1f} ms  "
+          f"p95 {entry['p95_s'] * 1000:9.1f} ms  upstream requests {stub.stats['requests']}  "
+          f"{entry['bytes_per_call'] / 1024:8.1f} KiB/call  {entry['bytes_sent_per_call'] / 1024:8.1f} KiB sent/call")
+    return result
+
+
+def make_payload(target_bytes):
+    """A model-like dict whose JSON encoding is roughly target_bytes long."""
+    rule = {"id": 0, "weights": [0.125, 0.25, 0.5, 1.0], "package": "com.example.app", "enabled": True}
+    rule_size = len(json.dumps(rule)) + 2
+    rules = [dict(rule, id=i) for i in range(max(1, target_bytes // rule_size))]
+    return {"OnDeviceModels": {"rules": rules}, "Version": 1}
+
+
+def bench_play_store(results, stub, args):
+    n = args.calls
+    for probe in play_transport.PROBE_MODES:
+        for case, prefix in (("exists", "com.stub.bench"), ("missing", "missing.bench")):
+            params = {"calls": n, "case": case}
+            if probe != play_transport.PLAY_PROBE_MODE:
+                params["probe"] = probe # default-mode entries keep their old params for --compare
+            run_benchmark(results, stub, "verify_package_exists", params,
+                          lambda: [scraper_logic.verify_package_exists(f"{prefix}{i}", region="US", probe=probe)
+                                   for i in range(n)],
+                          args.repeat, not args.verbose, per_call=n)
+    run_benchmark(results, stub, "verify_package_exists", {"calls": 1, "case": "missing", "use_fallbacks": True},
+                  lambda: scraper_logic.verify_package_exists("missing.fallback", region="IL", use_fallbacks=True),
+                  args.repeat, not args.verbose)
+    run_benchmark(results, stub, "get_package_by_name", {"calls": n},
+                  lambda: [scraper_logic.get_package_by_name(f"Bench App {i}", region="US") for i in range(n)],
+                  args.repeat, not args.verbose, per_call=n)
+
+
+def bench_process_results(results, stub, args):
+    for size in args.list_sizes:
+        client = FakeGenaiClient(research_size=size, missing_rate=args.missing_rate, latency=args.gemini_latency)
+        for resolve_with_ai in (False, True):
+            run_benchmark(
+                results, stub, "process_results",
+                {"apps": size, "missing_rate": args.missing_rate, "resolve_with_ai": resolve_with_ai},
+                lambda: scraper_logic.process_results(
+                    client.research_apps("Bench Topic"), "US", resolve_with_ai, client, "fake-model"
+                ),
+                args.repeat, not args.verbose,
+            )
+
+
+def bench_config_export(results, args):
+    for size in args.payload_sizes:
+        payload = make_payload(size)
+        raw = json.dumps(payload["OnDeviceModels"]).encode("utf-8")
+        encoded = ConfigExport.compress_encode(raw)
+
+        for name, fn in (
+            ("ConfigExport.compress_encode", lambda: ConfigExport.compress_encode(raw)),
+            ("ConfigExport.decrypt_js_model", lambda: ConfigExport.decrypt_js_model(encoded.encode("utf-8"))),
+            ("ConfigExport.write_zip", lambda: ConfigExport.write_zip(json.loads(json.dumps(payload)), io.BytesIO())),
+            # /api/export-binary-model: first encode of a model, then a repeat of the same body
+            ("encode_cache.encode_json miss", lambda: (encode_cache.clear(), encode_cache.encode_json(raw))),
+            ("encode_cache.encode_json hit", lambda: encode_cache.encode_json(raw)),
+        ):
+            durations, _ = measure(fn, args.repeat)
+            entry = {"name": name, "params": {"json_bytes": len(raw)}, "encoded_bytes": len(encoded)}
+            entry.update(summarize(durations))
+            entry["mb_per_s"] = round(len(raw) / entry["median_s"] / 1e6, 2) if entry["median_s"] else None
+            results.append(entry)
+            print(f"{name:<28} {json.dumps(entry['params']):<40} median {entry['median_s'] * 1000:9.1f} ms  "
+                  f"{entry['mb_per_s']} MB/s")
+
+
+def compare(results, baseline_path):
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    old = {(b["name"], json.dumps(b["params"], sort_keys=True)): b for b in baseline.get("results", [])}
+    print(f"\nComparison against {baseline_path} (commit {baseline.get('meta', {}).get('commit')}):")
+    for entry in results:
+        key = (entry["name"], json.dumps(entry["params"], sort_keys=True))
+        if key not in old or not old[key]["median_s"]:
+            continue
+        ratio = entry["median_s"] / old[key]["median_s"]
+        flag = "  << slower" if ratio > 1.1 else ("  faster" if ratio < 0.9 else "")
+        print(f"{entry['name']:<28} {key[1]:<40} {old[key]['median_s'] * 1000:9.1f} -> {entry['median_s'] * 1000:9.1f} ms "
+              f"({ratio:.2f}x){flag}")
+
+
+def parse_sizes(text):
+    return [int(x) for x in text.split(",") if x.strip()]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.05, help="Play Store stub latency per request (s)")
+    parser.add_argument("--jitter", type=float, default=0.01, help="+/- latency jitter (s)")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="fraction of stub requests answered with 429")
+    parser.add_argument("--rate-404", type=float, default=0.0, help="extra fraction of detail requests answered with 404")
+    parser.add_argument("--detail-page-bytes", type=int, default=300_000, help="size of the stub details page")
+    parser.add_argument("--head-status", type=int, default=None,
+                        help="status the stub answers every HEAD with (e.g. 405; default: same as GET)")
+    parser.add_argument("--gemini-latency", type=float, default=0.5, help="fake Gemini latency per call (s)")
+    parser.add_argument("--missing-rate", type=float, default=0.2, help="fraction of researched packages that 404")
+    parser.add_argument("--list-sizes", type=parse_sizes, default=[10, 30, 60])
+    parser.add_argument("--payload-sizes", type=parse_sizes, default=[10_000, 1_000_000, 10_000_000])
+    parser.add_argument("--calls", type=int, default=10, help="calls per verify / search benchmark run")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--only", choices=["play", "process", "export"], action="append",
+                        help="run only some groups (repeatable)")
+    parser.add_argument("--with-cache", action="store_true", help="keep the verification cache enabled")
+    parser.add_argument("--output", default=None, help="results JSON path (default benchmarks/results/bench-<commit>.json)")
+    parser.add_argument("--compare", default=None, help="baseline results JSON to compare against")
+    parser.add_argument("--verbose", action="store_true", help="do not mute scraper_logic output")
+    args = parser.parse_args(argv)
+    groups = set(args.only or ["play", "process", "export"])
+
+    if not args.with_cache:
+        verify_cache.VERIFY_CACHE_ENABLED = False
+
+    results = []
+    stub = PlayStoreStub(latency=args.latency, jitter=args.jitter, rate_429=args.rate_429,
+                         rate_404=args.rate_404, detail_page_bytes=args.detail_page_bytes,
+                         head_status=args.head_status)
+    with stub:
+        play_transport.PLAY_STORE_BASE_URL = stub.base_url
+        if "play" in groups:
+            bench_play_store(results, stub, args)
+        if "process" in groups:
+            bench_process_results(results, stub, args)
+    if "export" in groups:
+        bench_config_export(results, args)
+
+    commit = git_commit()
+    report = {
+        "meta": {
+            "commit": commit,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "config": {k: v for k, v in vars(args).items() if k not in ("output", "compare")},
+            "transport": play_transport.get_stats(),
+        },
+        "results": results,
+    }
+    output = args.output or os.path.join(REPO_ROOT, "benchmarks", "results", f"bench-{commit or 'local'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nSaved results to {output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+import contextvars
+import time
+from contextlib import contextmanager
+
+# Per-request time budget. scope() sets an absolute deadline (time.monotonic) for everything run
+# inside the block - including submit()-ed threads and asyncio tasks, which copy the context -
+# and outbound calls shorten their timeouts with cap() so none of them outlives the request.
+
+_current_deadline = contextvars.ContextVar("deadline", default=None)
+
+
+class DeadlineExceeded(TimeoutError):
+    pass
+
+
+def after(seconds):
+    """
+    Absolute deadline seconds from now; None for no deadline (seconds None or <= 0).
+    """
+    if not seconds or seconds <= 0:
+        return None
+    return time.monotonic() + seconds
+
+
+@contextmanager
+def scope(deadline):
+    """
+    Runs the block under deadline (from after()). A nested scope can only make the deadline earlier.
+    """
+    current = _current_deadline.get()
+    if deadline is None or (current is not None and current <= deadline):
+        yield current
+        return
+    token = _current_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current_deadline.reset(token)
+
+
+def remaining():
+    """
+    Seconds left before the current deadline (0.0 once it has passed), None without a deadline.
+    """
+    deadline = _current_deadline.get()
+    if deadline is None:
+        return None
+    return max(0.0, deadline - time.monotonic())
+
+
+def cap(timeout):
+    """
+    timeout shortened to the time left before the current deadline (None means no limit).
+    Raises DeadlineExceeded when the deadline has already passed.
+    """
+    left = remaining()
+    if left is None:
+        return timeout
+    if left <= 0:
+        raise DeadlineExceeded("Request deadline exceeded")
+    return left if timeout is None else min(timeout, left)
@@ -0,0 +1,73 @@
+import copy
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# In-memory TTL / LRU cache for get_app_details results keyed by (package, region).
+# Apps Play Store reports as missing are remembered too, for a shorter time.
+
+DETAILS_CACHE_TTL = float(os.environ.get("DETAILS_CACHE_TTL", "3600"))
+DETAILS_CACHE_NEGATIVE_TTL = float(os.environ.get("DETAILS_CACHE_NEGATIVE_TTL", "300"))
+DETAILS_CACHE_MAX_ENTRIES = int(os.environ.get("DETAILS_CACHE_MAX_ENTRIES", "2000"))
+
+_lock = threading.Lock()
+_entries = OrderedDict()  # key -> (created_at, details or None)
+_stats = {"hits": 0, "misses": 0, "negative_hits": 0, "writes": 0}
+
+
+def _key(package_id, region):
+    return (str(package_id).strip(), str(region or "US").strip().upper())
+
+
+def get(package_id, region):
+    """
+    Returns (True, details) for a fresh entry - details is None for a cached "not found" -
+    or (False, None) on a miss. details is a deep copy, so callers may mutate it.
+    """
+    key = _key(package_id, region)
+    now = time.time()
+    with _lock:
+        entry = _entries.get(key)
+        if entry is not None:
+            created_at, details = entry
+            ttl = DETAILS_CACHE_TTL if details is not None else DETAILS_CACHE_NEGATIVE_TTL
+            if now - created_at < ttl:
+                _entries.move_to_end(key)
+                _stats["hits"] += 1
+                if details is None:
+                    _stats["negative_hits"] += 1
+                return True, copy.deepcopy(details)
+            del _entries[key]
+        _stats["misses"] += 1
+    return False, None
+
+
+def put(package_id, region, details):
+    """
+    Stores details for (package, region); details=None records that the app does not exist.
+    """
+    key = _key(package_id, region)
+    details = copy.deepcopy(details)
+    with _lock:
+        _entries[key] = (time.time(), details)
+        _entries.move_to_end(key)
+        while len(_entries) > DETAILS_CACHE_MAX_ENTRIES:
+            _entries.popitem(last=False)
+        _stats["writes"] += 1
+
+
+def clear():
+    with _lock:
+        _entries.clear()
+
+
+def get_stats():
+    with _lock:
+        stats = dict(_stats)
+        stats["entries"] = len(_entries)
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_ratio"] = round(stats["hits"] / lookups, 3) if lookups else 0.0
+    stats["ttl"] = DETAILS_CACHE_TTL
+    stats["negative_ttl"] = DETAILS_CACHE_NEGATIVE_TTL
+    return stats
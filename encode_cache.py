@@ -0,0 +1,79 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+import ConfigExport
+
+# Content-addressed LRU of compress_encode outputs for the model encode endpoints
+# (/api/export-binary-model, /api/encode-zipped-model), which the UI calls with the same model
+# over and over while editing. Entries are keyed by the SHA-256 of the request body and the zlib
+# level, so a repeat encode is answered without parsing the body at all.
+
+ENCODE_CACHE_MAX_ENTRIES = int(os.environ.get("ENCODE_CACHE_MAX_ENTRIES", "64"))
+ENCODE_CACHE_MAX_BYTES = int(os.environ.get("ENCODE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+# zlib level for encoded models: 1 is fastest, 9 smallest, -1 zlib's default (6)
+ENCODE_ZLIB_LEVEL = int(os.environ.get("ENCODE_ZLIB_LEVEL", "-1"))
+
+_lock = threading.Lock()
+_entries = OrderedDict()  # (body digest, level) -> encoded string
+_bytes = 0
+_stats = {"hits": 0, "misses": 0, "evictions": 0}
+
+
+def _payload(body):
+    # The bytes to compress. An ASCII body already is the JSON to ship (it is only validated);
+    # anything else is re-serialized so the payload stays ASCII-only like json.dumps output.
+    data = json.loads(body)
+    if body.isascii():
+        return body
+    return ConfigExport.serialize_model(data)
+
+
+def encode_json(body: bytes, level: int = None):
+    """
+    compress_encode of the JSON model in a request body, served from the cache when the same
+    body was encoded before at the same level. Returns (encoded string, hit).
+    The output decodes with decrypt_js_model / Java's compressEncode counterpart like before.
+    Invalid JSON raises ValueError.
+    """
+    global _bytes
+    level = ENCODE_ZLIB_LEVEL if level is None else level
+    key = (hashlib.sha256(body).hexdigest(), level)
+    with _lock:
+        encoded = _entries.get(key)
+        if encoded is not None:
+            _entries.move_to_end(key)
+            _stats["hits"] += 1
+            return encoded, True
+        _stats["misses"] += 1
+
+    encoded = ConfigExport.compress_encode(_payload(body), level)
+    with _lock:
+        if key not in _entries:
+            _entries[key] = encoded
+            _bytes += len(encoded)
+        while _entries and (len(_entries) > ENCODE_CACHE_MAX_ENTRIES or _bytes > ENCODE_CACHE_MAX_BYTES):
+            _, evicted = _entries.popitem(last=False)
+            _bytes -= len(evicted)
+            _stats["evictions"] += 1
+    return encoded, False
+
+
+def clear():
+    global _bytes
+    with _lock:
+        _entries.clear()
+        _bytes = 0
+
+
+def get_stats():
+    with _lock:
+        stats = dict(_stats)
+        stats["entries"] = len(_entries)
+        stats["bytes"] = _bytes
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_ratio"] = round(stats["hits"] / lookups, 3) if lookups else 0.0
+    stats["max_bytes"] = ENCODE_CACHE_MAX_BYTES
+    stats["zlib_level"] = ENCODE_ZLIB_LEVEL
+    return stats
@@ -0,0 +1,94 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+import scraper_logic
+
+# Reuses genai clients and the filtered model list across requests.
+# Entries are keyed by a hash of the API key so raw keys are never kept as dict keys.
+
+GENAI_CLIENT_POOL_SIZE = int(os.environ.get("GENAI_CLIENT_POOL_SIZE", "32"))
+GENAI_CLIENT_IDLE_TTL = float(os.environ.get("GENAI_CLIENT_IDLE_TTL", "900"))
+GENAI_MODEL_LIST_TTL = float(os.environ.get("GENAI_MODEL_LIST_TTL", "3600"))
+
+_lock = threading.Lock()
+_clients = OrderedDict()  # key_hash -> (client, last_used)
+_models = {}  # key_hash -> (fetched_at, models)
+_stats = {"client_hits": 0, "client_misses": 0, "client_evictions": 0, "model_hits": 0, "model_misses": 0}
+
+
+def _key_hash(api_key):
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()
+
+
+def _evict(now):
+    # Idle clients first, then least recently used ones beyond the pool size.
+    # Evicted clients are only dropped, not closed, since another request may still be using them.
+    for key_hash in [k for k, (_, last_used) in _clients.items() if now - last_used > GENAI_CLIENT_IDLE_TTL]:
+        del _clients[key_hash]
+        _stats["client_evictions"] += 1
+    while len(_clients) > GENAI_CLIENT_POOL_SIZE:
+        _clients.popitem(last=False)
+        _stats["client_evictions"] += 1
+
+
+def get_client(api_key):
+    """
+    Returns a pooled genai.Client for api_key, creating it on first use.
+    """
+    key_hash = _key_hash(api_key)
+    now = time.time()
+    with _lock:
+        _evict(now)
+        entry = _clients.get(key_hash)
+        if entry is not None:
+            _clients[key_hash] = (entry[0], now)
+            _clients.move_to_end(key_hash)
+            _stats["client_hits"] += 1
+            return entry[0]
+        _stats["client_misses"] += 1
+
+    from google import genai # imported on first use: the SDK is slow to load
+    client = genai.Client(api_key=api_key)
+    with _lock:
+        # Another request may have created one meanwhile; keep the first
+        entry = _clients.get(key_hash)
+        if entry is not None:
+            client = entry[0]
+        _clients[key_hash] = (client, now)
+        _clients.move_to_end(key_hash)
+        _evict(now)
+    return client
+
+
+def get_supported_models(api_key, refresh=False):
+    """
+    scraper_logic.list_supported_models with a per-key TTL cache.
+    Empty lists (listing errors) are not cached.
+    """
+    key_hash = _key_hash(api_key)
+    now = time.time()
+    if not refresh:
+        with _lock:
+            entry = _models.get(key_hash)
+            if entry is not None and now - entry[0] < GENAI_MODEL_LIST_TTL:
+                _stats["model_hits"] += 1
+                return list(entry[1])
+            _stats["model_misses"] += 1
+
+    models = scraper_logic.list_supported_models(get_client(api_key))
+    if models:
+        with _lock:
+            _models[key_hash] = (now, list(models))
+            for stale in [k for k, (fetched_at, _) in _models.items() if now - fetched_at >= GENAI_MODEL_LIST_TTL]:
+                del _models[stale]
+    return models
+
+
+def get_stats():
+    with _lock:
+        stats = dict(_stats)
+        stats["clients"] = len(_clients)
+        stats["model_lists"] = len(_models)
+    return stats
@@ -0,0 +1,177 @@
+import bisect
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+# Minimal Prometheus-style metrics (text exposition format) without extra dependencies.
+# Stage / upstream timings can also be collected per request (see request_timings).
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+_registry = []
+_current_timings = contextvars.ContextVar("request_timings", default=None)
+
+
+def _format_labels(labelnames, values, extra=None):
+    pairs = list(zip(labelnames, values)) + list(extra or [])
+    if not pairs:
+        return ""
+    escaped = [(k, str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")) for k, v in pairs]
+    return "{" + ",".join(f'{k}="{v}"' for k, v in escaped) + "}"
+
+
+class Counter:
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+        _registry.append(self)
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._values = {}  # label values -> [bucket counts..., sum, count]
+        _registry.append(self)
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0] * len(self.buckets) + [0.0, 0]
+            if index < len(self.buckets):
+                state[index] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, state in sorted(self._values.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, state):
+                    cumulative += count
+                    lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, [('le', bound)])} {cumulative}")
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, [('le', '+Inf')])} {state[-1]}")
+                lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {round(state[-2], 6)}")
+                lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {state[-1]}")
+        return lines
+
+
+STAGE_SECONDS = Histogram("app_search_stage_seconds", "Time spent per processing stage", ["stage"])
+UPSTREAM_SECONDS = Histogram("app_search_upstream_seconds", "Time spent per outbound call", ["upstream"])
+VERIFY_OUTCOMES = Counter("app_search_verify_outcomes_total", "Play Store existence checks by outcome", ["outcome"])
+RESOLVE_PATHS = Counter("app_search_resolve_path_total", "How each app in process_results was resolved", ["path", "status"])
+COALESCED_CALLS = Counter("app_search_coalesced_calls_total", "Calls that shared an identical call already in flight", ["call"])
+
+
+class RequestTimings:
+    """Per-request breakdown: {stage or upstream: {count, total_s, max_s}}."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._started = time.perf_counter()
+        self._entries = {}
+
+    def add(self, key, seconds):
+        with self._lock:
+            entry = self._entries.setdefault(key, {"count": 0, "total_s": 0.0, "max_s": 0.0})
+            entry["count"] += 1
+            entry["total_s"] += seconds
+            entry["max_s"] = max(entry["max_s"], seconds)
+
+    def as_dict(self):
+        with self._lock:
+            breakdown = {
+                k: {"count": v["count"], "total_s": round(v["total_s"], 4), "max_s": round(v["max_s"], 4)}
+                for k, v in self._entries.items()
+            }
+        return {"elapsed_s": round(time.perf_counter() - self._started, 4), "breakdown": breakdown}
+
+
+@contextmanager
+def request_timings():
+    """Collects stage / upstream timings of everything run inside the block (including submit()-ed work)."""
+    timings = RequestTimings()
+    token = _current_timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _current_timings.reset(token)
+
+
+def _record(histogram, label, key, seconds):
+    histogram.observe(seconds, **{histogram.labelnames[0]: label})
+    timings = _current_timings.get()
+    if timings is not None:
+        timings.add(key, seconds)
+
+
+@contextmanager
+def stage(name):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        _record(STAGE_SECONDS, name, name, time.perf_counter() - started)
+
+
+@contextmanager
+def upstream(name):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        _record(UPSTREAM_SECONDS, name, f"upstream:{name}", time.perf_counter() - started)
+
+
+def submit(executor, fn, *args, **kwargs):
+    """executor.submit that carries the caller's context, so worker threads report into the same request timings."""
+    return executor.submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+
+def _render_stats(prefix, stats, counters=()):
+    # Exposes a plain stats dict (cache / pool modules) as counters and gauges
+    lines = []
+    for key, value in sorted(stats.items()):
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            continue
+        kind = "counter" if key in counters else "gauge"
+        name = f"{prefix}_{key}_total" if kind == "counter" else f"{prefix}_{key}"
+        lines.append(f"# TYPE {name} {kind}")
+        lines.append(f"{name} {value}")
+    return lines
+
+
+def render(extra_stats=None):
+    """
+    Prometheus text exposition of every registered metric.
+    extra_stats: {prefix: (stats dict, names that are counters)} rendered after the registry.
+    """
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    for prefix, (stats, counters) in (extra_stats or {}).items():
+        lines.extend(_render_stats(prefix, stats, counters))
+    return "\n".join(lines) + "\n"
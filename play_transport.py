@@ -0,0 +1,509 @@
+import asyncio
+import os
+import random
+import threading
+import time
+import weakref
+from contextlib import asynccontextmanager, contextmanager
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+import deadlines
+
+# requests and httpx are imported by the first sync / async request, not at startup
+
+# Shared keep-alive transport for all play.google.com traffic.
+# One requests.Session is shared by every thread, so TCP/TLS connections are reused
+# instead of being re-opened for every verify / search call.
+
+# Where outbound Play Store requests go (benchmarks point this at a local stub).
+# User-facing play_store_url links always use https://play.google.com.
+PLAY_STORE_BASE_URL = os.environ.get("PLAY_STORE_BASE_URL", "https://play.google.com").rstrip("/")
+
+PLAY_POOL_SIZE = int(os.environ.get("PLAY_POOL_SIZE", "32"))
+PLAY_TIMEOUT = float(os.environ.get("PLAY_TIMEOUT", "10"))
+
+# Per-host outbound rate (requests/s). Starts at PLAY_RATE_LIMIT, halves on 429/503 (not below
+# PLAY_RATE_MIN) and grows back by PLAY_RATE_INCREASE per successful response. 0 disables the bucket.
+PLAY_RATE_LIMIT = float(os.environ.get("PLAY_RATE_LIMIT", "100"))
+PLAY_RATE_MIN = float(os.environ.get("PLAY_RATE_MIN", "1"))
+PLAY_RATE_INCREASE = float(os.environ.get("PLAY_RATE_INCREASE", "0.5"))
+
+# Bounded retries with full-jitter exponential backoff; Retry-After is honored up to PLAY_BACKOFF_MAX
+PLAY_MAX_RETRIES = int(os.environ.get("PLAY_MAX_RETRIES", "2"))
+PLAY_BACKOFF_BASE = float(os.environ.get("PLAY_BACKOFF_BASE", "0.5"))
+PLAY_BACKOFF_MAX = float(os.environ.get("PLAY_BACKOFF_MAX", "10"))
+
+# Existence probes (probe()): "head" sends a HEAD request, "stream" stops reading after the status
+# line and headers, "get" downloads the whole page. Streamed bodies up to PROBE_DRAIN_BYTES are still
+# read so the connection can go back to the pool; larger ones (a details page) are dropped with their
+# connection, so "stream" opens a new connection on almost every probe - "head" keeps it pooled.
+# A HEAD answered with anything but 200/404 (405, a redirect to a consent page, a bot wall...) is
+# not trusted: the probe is repeated as a "stream" GET (counted in head_fallbacks).
+PLAY_PROBE_MODE = os.environ.get("PLAY_PROBE_MODE", "head")
+PROBE_MODES = ("stream", "head", "get")
+PROBE_DRAIN_BYTES = int(os.environ.get("PROBE_DRAIN_BYTES", str(16 * 1024)))
+HEAD_TRUSTED_STATUSES = frozenset({200, 404})
+
+THROTTLE_STATUSES = frozenset({429, 503})
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
+}
+
+_session = None
+_session_lock = threading.Lock()
+_stats_lock = threading.Lock()
+_stats = {"requests": 0, "errors": 0, "async_requests": 0, "async_errors": 0, "retries": 0, "throttled": 0,
+          "probes": 0, "head_fallbacks": 0, "bytes_received": 0, "new_connections": 0, "async_new_connections": 0}
+# One httpx.AsyncClient per event loop (an AsyncClient cannot be shared across loops)
+_async_clients = weakref.WeakKeyDictionary()
+
+
+_counting_pools = None
+
+
+def _counting_pool_classes():
+    # urllib3 pool classes whose connections count every real socket connect (new_connections),
+    # including the silent reconnects of pooled connections the server had dropped
+    global _counting_pools
+    if _counting_pools is None:
+        from urllib3.connection import HTTPConnection, HTTPSConnection
+        from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+        class CountingHTTPConnection(HTTPConnection):
+            def connect(self):
+                _count(new_connections=1)
+                return super().connect()
+
+        class CountingHTTPSConnection(HTTPSConnection):
+            def connect(self):
+                _count(new_connections=1)
+                return super().connect()
+
+        class CountingHTTPConnectionPool(HTTPConnectionPool):
+            ConnectionCls = CountingHTTPConnection
+
+        class CountingHTTPSConnectionPool(HTTPSConnectionPool):
+            ConnectionCls = CountingHTTPSConnection
+
+        _counting_pools = {"http": CountingHTTPConnectionPool, "https": CountingHTTPSConnectionPool}
+    return _counting_pools
+
+
+async def _trace_async_connect(event_name, info):
+    # httpcore trace hook (request extension): one event per new TCP connection of the AsyncClient
+    if event_name == "connection.connect_tcp.complete":
+        _count(async_new_connections=1)
+
+
+def _build_session(pool_size):
+    import requests
+    from requests.adapters import HTTPAdapter
+    session = requests.Session()
+    # pool_block=True caps open sockets at pool_size; extra threads wait for a free connection
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, pool_block=True)
+    adapter.poolmanager.pool_classes_by_scheme = _counting_pool_classes()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update(DEFAULT_HEADERS)
+    return session
+
+
+class HostRateLimiter:
+    """
+    Token bucket for one host with additive-increase / multiplicative-decrease rate control.
+    Callers reserve a token and sleep for the returned delay outside the lock (sync or async).
+    """
+
+    def __init__(self, rate=None, min_rate=None, increase=None):
+        self.max_rate = PLAY_RATE_LIMIT if rate is None else rate
+        self.min_rate = min(PLAY_RATE_MIN if min_rate is None else min_rate, self.max_rate)
+        self.increase = PLAY_RATE_INCREASE if increase is None else increase
+        self.rate = self.max_rate
+        self.throttled = 0
+        self._lock = threading.Lock()
+        self._tokens = max(1.0, self.rate)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._last_cut = 0.0
+
+    def reserve(self):
+        """
+        Takes one token and returns how many seconds to wait before sending.
+        Tokens may go negative: each caller waits for its own share of the deficit.
+        """
+        with self._lock:
+            now = time.monotonic()
+            wait = max(0.0, self._paused_until - now)
+            if self.rate > 0:
+                self._tokens = min(max(1.0, self.rate), self._tokens + (now - self._updated) * self.rate)
+                self._tokens -= 1
+                if self._tokens < 0:
+                    wait = max(wait, -self._tokens / self.rate)
+            self._updated = now
+            return wait
+
+    def acquire(self):
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    async def aacquire(self):
+        wait = self.reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def record(self, status_code, retry_after=None):
+        """
+        Adjusts the rate from a response: 429/503 halve it (at most once per second, so a burst
+        of throttled responses counts once) and pause the host for Retry-After; anything else grows it.
+        """
+        with self._lock:
+            now = time.monotonic()
+            if status_code in THROTTLE_STATUSES:
+                self.throttled += 1
+                if self.rate > 0 and now - self._last_cut >= 1.0:
+                    self.rate = max(self.min_rate, self.rate / 2)
+                    self._tokens = min(self._tokens, max(1.0, self.rate))
+                    self._last_cut = now
+                if retry_after:
+                    self._paused_until = max(self._paused_until, now + min(retry_after, PLAY_BACKOFF_MAX))
+            elif status_code < 500 and self.rate > 0:
+                self.rate = min(self.max_rate, self.rate + self.increase)
+
+    def get_stats(self):
+        with self._lock:
+            return {"rate": round(self.rate, 3), "throttled": self.throttled}
+
+
+_limiters = {}  # host -> HostRateLimiter
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(url):
+    """
+    Returns the shared HostRateLimiter for the host of url.
+    """
+    host = urlsplit(url).netloc.lower()
+    limiter = _limiters.get(host)
+    if limiter is None:
+        with _limiters_lock:
+            limiter = _limiters.setdefault(host, HostRateLimiter())
+    return limiter
+
+
+def _retry_after_seconds(value):
+    # Retry-After is either delta-seconds or an HTTP date
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+def _backoff_delay(attempt, retry_after=None):
+    """
+    Full-jitter exponential backoff for the given retry attempt (0-based), never shorter than
+    Retry-After. Returns None when the server asks for a longer pause than PLAY_BACKOFF_MAX.
+    """
+    if retry_after is not None and retry_after > PLAY_BACKOFF_MAX:
+        return None
+    delay = random.uniform(0, min(PLAY_BACKOFF_MAX, PLAY_BACKOFF_BASE * 2 ** attempt))
+    return max(delay, retry_after or 0.0)
+
+
+def _retry_fits(delay):
+    # No point backing off past the request deadline (see deadlines.scope)
+    left = deadlines.remaining()
+    return left is None or delay < left
+
+
+def _count(**deltas):
+    with _stats_lock:
+        for name, delta in deltas.items():
+            _stats[name] += delta
+
+
+def get_session():
+    """
+    Returns the shared pooled session, creating it on first use.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = _build_session(PLAY_POOL_SIZE)
+    return _session
+
+
+def configure(pool_size=None, timeout=None):
+    """
+    Changes pool size / default timeout. The current session is closed and
+    a new one is built lazily on the next request.
+    """
+    global _session, PLAY_POOL_SIZE, PLAY_TIMEOUT
+    with _session_lock:
+        if pool_size is not None:
+            PLAY_POOL_SIZE = int(pool_size)
+        if timeout is not None:
+            PLAY_TIMEOUT = float(timeout)
+        if _session is not None:
+            _session.close()
+            _session = None
+
+
+def request(method, url, timeout=None, headers=None, retries=None, **kwargs):
+    """
+    Request through the shared session. timeout defaults to PLAY_TIMEOUT,
+    headers are merged on top of DEFAULT_HEADERS.
+    Paced by the host's rate limiter; 429/5xx responses and connection errors are retried
+    up to retries times (default PLAY_MAX_RETRIES). The last response is returned as-is.
+    With stream=True the body is left unread and the caller must close the response.
+    Inside a deadlines.scope the timeout is capped to the time left and retries that would not
+    fit are skipped; past the deadline deadlines.DeadlineExceeded is raised.
+    """
+    import requests
+    session = get_session()
+    limiter = get_limiter(url)
+    retries = PLAY_MAX_RETRIES if retries is None else retries
+    attempt = 0
+    while True:
+        call_timeout = deadlines.cap(timeout if timeout is not None else PLAY_TIMEOUT)
+        limiter.acquire()
+        _count(requests=1)
+        try:
+            response = session.request(method, url, timeout=call_timeout, headers=headers, **kwargs)
+        except requests.ConnectionError:
+            _count(errors=1)
+            if attempt >= retries:
+                raise
+            delay = _backoff_delay(attempt)
+            if not _retry_fits(delay):
+                raise
+        except Exception:
+            _count(errors=1)
+            raise
+        else:
+            retry_after = _retry_after_seconds(response.headers.get("Retry-After"))
+            limiter.record(response.status_code, retry_after)
+            if response.status_code in THROTTLE_STATUSES:
+                _count(throttled=1)
+            if not kwargs.get("stream"):
+                _count(bytes_received=_wire_bytes(response))
+            if response.status_code not in RETRY_STATUSES or attempt >= retries:
+                return response
+            delay = _backoff_delay(attempt, retry_after)
+            if delay is None or not _retry_fits(delay):
+                return response
+            response.close()
+        attempt += 1
+        _count(retries=1)
+        time.sleep(delay)
+
+
+def get(url, timeout=None, headers=None, retries=None, **kwargs):
+    """
+    GET through the shared session (see request()).
+    """
+    return request("GET", url, timeout=timeout, headers=headers, retries=retries, **kwargs)
+
+
+def _wire_bytes(response):
+    # Body bytes read off the socket so far (before content decoding)
+    try:
+        return response.raw.tell()
+    except Exception:
+        return 0
+
+
+def _probe_mode(mode):
+    mode = mode or PLAY_PROBE_MODE
+    if mode not in PROBE_MODES:
+        raise ValueError(f"Unknown probe mode: {mode} (expected one of {', '.join(PROBE_MODES)})")
+    return mode
+
+
+def probe(url, mode=None, timeout=None, retries=None):
+    """
+    Returns the status code of url without downloading more of the body than needed.
+    mode is one of PROBE_MODES (default PLAY_PROBE_MODE). Pacing and retries as in request().
+    """
+    mode = _probe_mode(mode)
+    _count(probes=1)
+    if mode == "get":
+        return get(url, timeout=timeout, retries=retries).status_code
+    if mode == "head":
+        status = request("HEAD", url, timeout=timeout, retries=retries).status_code
+        if status in HEAD_TRUSTED_STATUSES:
+            return status
+        _count(head_fallbacks=1)
+
+    with stream(url, timeout=timeout, retries=retries) as response:
+        if _small_body(response):
+            response.content # small body (e.g. an error page): drain it to keep the connection
+        return response.status_code
+
+
+def _small_body(response):
+    length = response.headers.get("Content-Length")
+    return length is not None and length.isdigit() and int(length) <= PROBE_DRAIN_BYTES
+
+
+@contextmanager
+def stream(url, timeout=None, headers=None, retries=None):
+    """
+    GET with the body left unread: yields the response for incremental reading (iter_content)
+    and closes it on exit, so a caller can stop downloading as soon as it has what it needs.
+    """
+    response = get(url, timeout=timeout, headers=headers, retries=retries, stream=True)
+    try:
+        yield response
+    finally:
+        _count(bytes_received=_wire_bytes(response))
+        response.close()
+
+
+def get_async_client():
+    """
+    Returns the pooled httpx.AsyncClient for the running event loop, creating it on first use.
+    """
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        import httpx
+        client = httpx.AsyncClient(
+            headers=DEFAULT_HEADERS,
+            timeout=PLAY_TIMEOUT,
+            follow_redirects=True, # Same as requests
+            limits=httpx.Limits(max_connections=PLAY_POOL_SIZE, max_keepalive_connections=PLAY_POOL_SIZE),
+        )
+        _async_clients[loop] = client
+    return client
+
+
+async def arequest(method, url, timeout=None, headers=None, retries=None, stream=False, **kwargs):
+    """
+    Async request through the per-loop pooled client, same defaults, pacing and retries as request().
+    With stream=True the body is left unread and the caller must aclose() the response.
+    """
+    import httpx
+    client = get_async_client()
+    limiter = get_limiter(url)
+    retries = PLAY_MAX_RETRIES if retries is None else retries
+    attempt = 0
+    while True:
+        call_timeout = deadlines.cap(timeout if timeout is not None else PLAY_TIMEOUT)
+        await limiter.aacquire()
+        _count(async_requests=1)
+        try:
+            outgoing = client.build_request(method, url, timeout=call_timeout, headers=headers,
+                                            extensions={"trace": _trace_async_connect}, **kwargs)
+            response = await client.send(outgoing, stream=stream)
+        except (httpx.ConnectError, httpx.ConnectTimeout, httpx.RemoteProtocolError):
+            _count(async_errors=1)
+            if attempt >= retries:
+                raise
+            delay = _backoff_delay(attempt)
+            if not _retry_fits(delay):
+                raise
+        except Exception:
+            _count(async_errors=1)
+            raise
+        else:
+            retry_after = _retry_after_seconds(response.headers.get("Retry-After"))
+            limiter.record(response.status_code, retry_after)
+            if response.status_code in THROTTLE_STATUSES:
+                _count(throttled=1)
+            if not stream:
+                _count(bytes_received=response.num_bytes_downloaded)
+            if response.status_code not in RETRY_STATUSES or attempt >= retries:
+                return response
+            delay = _backoff_delay(attempt, retry_after)
+            if delay is None or not _retry_fits(delay):
+                return response
+            await response.aclose()
+        attempt += 1
+        _count(retries=1)
+        await asyncio.sleep(delay)
+
+
+async def aget(url, timeout=None, headers=None, retries=None, **kwargs):
+    """
+    Async GET through the per-loop pooled client (see arequest()).
+    """
+    return await arequest("GET", url, timeout=timeout, headers=headers, retries=retries, **kwargs)
+
+
+async def aprobe(url, mode=None, timeout=None, retries=None):
+    """
+    Async probe(): status code of url, reading as little of the body as the mode allows.
+    """
+    mode = _probe_mode(mode)
+    _count(probes=1)
+    if mode == "get":
+        return (await aget(url, timeout=timeout, retries=retries)).status_code
+    if mode == "head":
+        status = (await arequest("HEAD", url, timeout=timeout, retries=retries)).status_code
+        if status in HEAD_TRUSTED_STATUSES:
+            return status
+        _count(head_fallbacks=1)
+
+    async with astream(url, timeout=timeout, retries=retries) as response:
+        if _small_body(response):
+            await response.aread() # small body: drain it to keep the connection
+        return response.status_code
+
+
+@asynccontextmanager
+async def astream(url, timeout=None, headers=None, retries=None):
+    """
+    Async stream(): yields the unread response (aiter_bytes) and closes it on exit.
+    """
+    response = await aget(url, timeout=timeout, headers=headers, retries=retries, stream=True)
+    try:
+        yield response
+    finally:
+        _count(bytes_received=response.num_bytes_downloaded)
+        await response.aclose()
+
+
+async def aclose():
+    """
+    Closes the AsyncClient of the running loop (call on shutdown).
+    """
+    client = _async_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+def get_stats():
+    """
+    Returns request / connection counters for the shared session and the async clients.
+    new_connections counts real socket connects (sync + async; async_new_connections is the async
+    share), reused_connections = requests served over an already-open connection.
+    retries / throttled count retried attempts and 429/503 responses; hosts has the current per-host rate.
+    bytes_received counts response body bytes read by the client (streamed probes stop early).
+    head_fallbacks counts "head" probes that were repeated as a streamed GET.
+    """
+    with _stats_lock:
+        stats = dict(_stats)
+
+    total_requests = stats["requests"] + stats["async_requests"]
+    stats["new_connections"] += stats["async_new_connections"]
+    stats["reused_connections"] = max(0, total_requests - stats["new_connections"])
+    stats["reuse_ratio"] = round(stats["reused_connections"] / total_requests, 3) if total_requests else 0.0
+    stats["pool_size"] = PLAY_POOL_SIZE
+    stats["timeout"] = PLAY_TIMEOUT
+    with _limiters_lock:
+        stats["hosts"] = {host: limiter.get_stats() for host, limiter in _limiters.items()}
+    return stats
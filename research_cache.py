@@ -0,0 +1,120 @@
+import copy
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# TTL cache for get_market_research results keyed by (topic, region, model_name).
+# Always kept in memory; also written to RESEARCH_CACHE_DIR as JSON files when that is set.
+
+RESEARCH_CACHE_TTL = float(os.environ.get("RESEARCH_CACHE_TTL", str(6 * 3600)))
+RESEARCH_CACHE_MAX_ENTRIES = int(os.environ.get("RESEARCH_CACHE_MAX_ENTRIES", "256"))
+RESEARCH_CACHE_DIR = os.environ.get("RESEARCH_CACHE_DIR", "")
+
+_lock = threading.Lock()
+_entries = OrderedDict()  # key -> (created_at, apps)
+_stats = {"hits": 0, "misses": 0, "disk_hits": 0, "writes": 0}
+
+
+def _key(topic, region, model_name):
+    return (str(topic).strip().lower(), str(region).strip().upper(), str(model_name).strip())
+
+
+def _disk_path(key):
+    digest = hashlib.sha256(json.dumps(key).encode("utf-8")).hexdigest()
+    return os.path.join(RESEARCH_CACHE_DIR, f"research_{digest}.json")
+
+
+def _read_disk(key):
+    if not RESEARCH_CACHE_DIR:
+        return None
+    try:
+        with open(_disk_path(key), "r", encoding="utf-8") as f:
+            payload = json.load(f)
+        return payload["created_at"], payload["apps"]
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"Research Cache Read Error: {e}")
+        return None
+
+
+def _write_disk(key, created_at, apps):
+    if not RESEARCH_CACHE_DIR:
+        return
+    try:
+        os.makedirs(RESEARCH_CACHE_DIR, exist_ok=True)
+        path = _disk_path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"key": list(key), "created_at": created_at, "apps": apps}, f)
+        os.replace(tmp_path, path)  # atomic, so concurrent workers never read half a file
+    except Exception as e:
+        print(f"Research Cache Write Error: {e}")
+
+
+def _remember(key, created_at, apps):
+    _entries[key] = (created_at, apps)
+    _entries.move_to_end(key)
+    while len(_entries) > RESEARCH_CACHE_MAX_ENTRIES:
+        _entries.popitem(last=False)
+
+
+def get(topic, region, model_name, ttl=None):
+    """
+    Returns (apps, age_seconds) for a fresh entry, None otherwise.
+    The returned list is a deep copy, so callers may mutate it (process_results does).
+    """
+    ttl = RESEARCH_CACHE_TTL if ttl is None else ttl
+    key = _key(topic, region, model_name)
+    now = time.time()
+    with _lock:
+        entry = _entries.get(key)
+        from_disk = False
+        if entry is None:
+            entry = _read_disk(key)
+            from_disk = entry is not None
+        if entry is not None and now - entry[0] < ttl:
+            if from_disk:
+                _remember(key, entry[0], entry[1])
+                _stats["disk_hits"] += 1
+            else:
+                _entries.move_to_end(key)
+            _stats["hits"] += 1
+            return copy.deepcopy(entry[1]), now - entry[0]
+        _stats["misses"] += 1
+    return None
+
+
+def put(topic, region, model_name, apps):
+    """
+    Stores a research result. Only a non-empty list of app dicts is cached: empty results (Gemini
+    errors) and anything else the model answered with (an object, a list of strings) are not.
+    """
+    if not apps or not isinstance(apps, list) or not all(isinstance(app, dict) for app in apps):
+        return
+    key = _key(topic, region, model_name)
+    created_at = time.time()
+    apps = copy.deepcopy(apps)
+    with _lock:
+        _remember(key, created_at, apps)
+        _stats["writes"] += 1
+    _write_disk(key, created_at, apps)
+
+
+def clear():
+    with _lock:
+        _entries.clear()
+
+
+def get_stats():
+    with _lock:
+        stats = dict(_stats)
+        stats["entries"] = len(_entries)
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_ratio"] = round(stats["hits"] / lookups, 3) if lookups else 0.0
+    stats["ttl"] = RESEARCH_CACHE_TTL
+    stats["disk_dir"] = RESEARCH_CACHE_DIR or None
+    return stats
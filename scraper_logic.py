@@ -1,10 +1,18 @@
 # scraper_logic.py
 import json
-import requests
+import deadlines
+import metrics
+import os
+import play_transport
+import details_cache
+import research_cache
+import verify_cache
 import re
-from google.genai import types
-from google_play_scraper import app as scrapper_app
-from google_play_scraper import search as scrapper_search
+import sys
+from single_flight import SingleFlight
+from concurrent.futures import ThreadPoolExecutor, as_completed
+# google.genai and google_play_scraper are imported where they are first used, so the service
+# starts without loading them (see startup.py for warm-up)
 
 COUNTRY_CODES_MAP = {
     "afghanistan": "AF", "aland islands": "AX", "albania": "AL", "algeria": "DZ", "american samoa": "AS",
@@ -60,6 +68,41 @@ COUNTRY_CODES_MAP = {
     "western sahara": "EH", "yemen": "YE", "zambia": "ZM", "zimbabwe": "ZW"
 }
 
+# Max number of apps verified in parallel by process_results
+PROCESS_MAX_WORKERS = int(os.environ.get("PROCESS_MAX_WORKERS", "8"))
+# Probe all fallback regions at once in verify_package_exists(use_fallbacks=True)
+VERIFY_PARALLEL_FALLBACKS = os.environ.get("VERIFY_PARALLEL_FALLBACKS", "1") != "0"
+VERIFY_FALLBACK_MAX_WORKERS = int(os.environ.get("VERIFY_FALLBACK_MAX_WORKERS", "16"))
+
+# Max app names per batched Gemini resolve prompt, and how many such prompts run at once
+GEMINI_RESOLVE_CHUNK_SIZE = int(os.environ.get("GEMINI_RESOLVE_CHUNK_SIZE", "20"))
+GEMINI_RESOLVE_MAX_WORKERS = int(os.environ.get("GEMINI_RESOLVE_MAX_WORKERS", "3"))
+
+# Outcomes of verify_package_status (also the "status" values written by finish_app).
+# UNKNOWN means every answer was transient (429 / 5xx / network error), so the app may well exist.
+VERIFIED = "Verified"
+NOT_FOUND = "Not Found"
+UNKNOWN = "Unknown"
+# Written by the async process_results for apps still being checked when the request deadline hit.
+PENDING = "Pending"
+
+# Search results: stop reading the page after SEARCH_MAX_IDS unique package IDs. With
+# SEARCH_RESULTS_VERIFIED, an ID taken from a live search listing counts as verified for that
+# region, so the search fallback does not re-check it with another request.
+SEARCH_MAX_IDS = int(os.environ.get("SEARCH_MAX_IDS", "5"))
+SEARCH_CHUNK_SIZE = int(os.environ.get("SEARCH_CHUNK_SIZE", str(16 * 1024)))
+SEARCH_RESULTS_VERIFIED = os.environ.get("SEARCH_RESULTS_VERIFIED", "1") != "0"
+
+PACKAGE_ID_PATTERN = re.compile(r"^[a-zA-Z][a-zA-Z0-9_]*(\.[a-zA-Z0-9_]+)+$")
+
+# Concurrent identical verify / search / details calls share one upstream request (async_scraper too)
+verify_flight = SingleFlight("verify")
+search_flight = SingleFlight("search")
+details_flight = SingleFlight("app_details")
+
+# Dedicated pool for region probes (never submits further work, so it cannot deadlock callers)
+_region_executor = ThreadPoolExecutor(max_workers=VERIFY_FALLBACK_MAX_WORKERS, thread_name_prefix="region-probe")
+
 def translate_country_to_code(region_name):
     """
     Translates a country name to a 2-letter ISO code.
@@ -77,11 +120,8 @@ def translate_country_to_code(region_name):
     # Try mapping
     return COUNTRY_CODES_MAP.get(clean_name, clean_name.upper()) # Return upper version of input if unknown
 
-def get_market_research(topic, region, client, model_name):
-    """
-    Uses Gemini to generate the initial list of apps.
-    """
-    prompt = f"""
+def market_research_prompt(topic, region):
+    return f"""
     Act as a Senior Mobile Market Researcher.
     
     Goal: Identify the top downloaded and most relevant Android applications used '{topic}' in '{region}'.
@@ -110,37 +150,282 @@ def get_market_research(topic, region, client, model_name):
       }}
     ]
     """
-    
+
+def _gemini_http_options(timeout_ms=None):
+    # Gemini HTTP timeout (ms), capped to the time left before the request deadline (deadlines.scope)
+    from google.genai import types
+    left = deadlines.remaining()
+    if left is not None:
+        left_ms = max(1, int(left * 1000))
+        timeout_ms = left_ms if timeout_ms is None else min(timeout_ms, left_ms)
+    return types.HttpOptions(timeout=timeout_ms) if timeout_ms is not None else None
+
+def market_research_config(model_name):
+    from google.genai import types
+    return types.GenerateContentConfig(
+        temperature=0.0,
+        thinking_config=types.ThinkingConfig(
+            include_thoughts=False
+        ) if "thinking" in model_name else None, # Only add thinking_config if supported
+        http_options=_gemini_http_options(),
+        tools=[types.Tool(google_search=types.GoogleSearch())]
+    )
+
+def get_market_research(topic, region, client, model_name):
+    """
+    Uses Gemini to generate the initial list of apps.
+    """
     try:
-        response = client.models.generate_content(
-            model=model_name, 
-            contents=prompt,
-            config=types.GenerateContentConfig(
-                temperature=0.0,
-                thinking_config=types.ThinkingConfig(
-                    include_thoughts=False
-                ) if "thinking" in model_name else None, # Only add thinking_config if supported
-                tools=[types.Tool(google_search=types.GoogleSearch())]
+        with metrics.stage("market_research"), metrics.upstream("gemini"):
+            response = client.models.generate_content(
+                model=model_name, 
+                contents=market_research_prompt(topic, region),
+                config=market_research_config(model_name)
             )
-        )
         
-        text = response.text
-        # Clean up markdown fences if present
-        if "```json" in text:
-            text = text.split("```json")[1].split("```")[0]
-        elif "```" in text:
-            text = text.split("```")[1].split("```")[0]
-            
-        return json.loads(text.strip())
+        return json.loads(strip_json_fences(response.text))
     except Exception as e:
         print(f"Gemini Error: {e}")
         return []
 
-def verify_package_exists(package_name, region="US", use_fallbacks=False):
+def get_market_research_cached(topic, region, client, model_name, refresh=False):
     """
-    Sends an HTTP GET request to the Google Play Store.
-    Returns the successful region code if the app exists, None otherwise.
+    get_market_research with a (topic, region, model_name) TTL cache in front of it.
+    refresh=True skips the lookup and replaces the cached entry with a fresh Gemini answer.
+    Returns (apps, cache_info) where cache_info = {"hit": bool, "age_seconds": float}.
+    """
+    if not refresh:
+        cached = research_cache_lookup(topic, region, model_name)
+        if cached is not None:
+            return cached
+
+    apps = get_market_research(topic, region, client, model_name)
+    research_cache.put(topic, region, model_name, apps)
+    return apps, {"hit": False, "age_seconds": 0.0}
+
+class JsonArrayStream:
+    """
+    Incremental parser for a JSON array of objects that arrives in pieces (e.g. streamed model output).
+    Anything before the array (prose, markdown fences) is skipped: the array starts at the first '['
+    after a ``` fence, or - before any fence - only at a '[' whose next non-blank character is '{',
+    so citations like "[1]" in a preamble are not taken for it. feed() returns the objects completed
+    by the new text, so each one can be used before the rest of the array exists.
+    done is True once the closing ']' was seen.
+    """
+
+    def __init__(self):
+        self.done = False
+        self._depth = 0  # 0 = before the array, 1 = between elements, 2+ = inside an element
+        self._current = []
+        self._in_string = False
+        self._escape = False
+        self._fenced = False  # a ``` fence was seen before the array
+        self._ticks = 0  # run of backticks so far
+        self._bracket = False  # saw a '[' before any fence, waiting for '{'
+
+    def _before_array(self, ch):
+        # Returns True when ch opened the array
+        self._ticks = self._ticks + 1 if ch == "`" else 0
+        if self._ticks == 3:
+            self._fenced = True
+        if self._bracket:
+            if ch.isspace():
+                return False
+            self._bracket = False
+            if ch == "{":
+                self._depth = 1
+                return True
+        if ch == "[":
+            if self._fenced:
+                self._depth = 1
+            else:
+                self._bracket = True
+        return False
+
+    def feed(self, text):
+        objects = []
+        for ch in text or "":
+            if self.done:
+                break
+            if self._depth == 0 and not self._before_array(ch):
+                continue
+            if self._depth == 1:
+                if ch == "{":
+                    self._depth = 2
+                    self._current = [ch]
+                elif ch == "]":
+                    self.done = True
+                continue
+
+            self._current.append(ch)
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch in "{[":
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth == 1:
+                    try:
+                        objects.append(json.loads("".join(self._current)))
+                    except ValueError as e:
+                        print(f"Skipping malformed entry in streamed JSON: {e}")
+                    self._current = []
+        return objects
+
+def research_fallback(text):
+    """
+    Whole-response parse (as in get_market_research) of a streamed reply JsonArrayStream found no
+    apps in. Returns the app objects of the parsed list; anything else (strings, numbers) is
+    dropped, and a reply with no app objects at all gives None.
+    """
+    if not text.strip():
+        return None
+    try:
+        apps = json.loads(strip_json_fences(text))
+    except ValueError as e:
+        print(f"Gemini Error: {e}")
+        return None
+    if not isinstance(apps, list):
+        return None
+    return [app for app in apps if isinstance(app, dict)] or None
+
+def chunk_text(chunk):
+    # Streamed chunks may carry only metadata (e.g. search grounding) and no text
+    try:
+        return chunk.text or ""
+    except Exception:
+        return ""
+
+def research_cache_lookup(topic, region, model_name):
+    cached = research_cache.get(topic, region, model_name)
+    if cached is None:
+        return None
+    apps, age = cached
+    print(f"📦 Market research cache hit for {topic} / {region} ({age:.0f}s old)")
+    return apps, {"hit": True, "age_seconds": round(age, 1)}
+
+def check_region(package_name, region, timeout=None, use_cache=True, probe=None):
+    """
+    Single existence check for one region, using play_transport.probe (probe = probe mode).
+    Returns True (200), False (404) or None (unexpected status / network error).
+    """
+    if use_cache:
+        cached = cached_check(package_name, region)
+        if cached is not None:
+            return cached
+
+    try:
+        with metrics.upstream("play_details"):
+            status_code = play_transport.probe(details_url(package_name, region), mode=probe, timeout=timeout)
+        return record_check(package_name, region, status_code)
+    except Exception as e:
+        return record_check_error(package_name, region, e)
+
+def details_url(package_name, region):
+    return f"{play_transport.PLAY_STORE_BASE_URL}/store/apps/details?id={package_name}&gl={region}"
+
+def cached_check(package_name, region):
+    """
+    verify_cache lookup for one region, logged like a live check. True / False / None (miss).
+    """
+    cached = verify_cache.get(package_name, region)
+    if cached is True:
+        print(f"Checking: {package_name} (region: {region})... ✅ Exists! (cached)")
+    elif cached is False:
+        print(f"Checking: {package_name} (region: {region})... ❌ Not Found (cached)")
+    return cached
+
+def record_check(package_name, region, status_code):
+    """
+    Logs, counts and caches the status of a details-page check. Returns True / False / None.
+    """
+    if status_code == 200:
+        print(f"Checking: {package_name} (region: {region})... ✅ Exists!")
+        metrics.VERIFY_OUTCOMES.inc(outcome="200")
+        verify_cache.put(package_name, region, True)
+        return True
+    elif status_code == 404:
+        print(f"Checking: {package_name} (region: {region})... ❌ Not Found (404)")
+        metrics.VERIFY_OUTCOMES.inc(outcome="404")
+        verify_cache.put(package_name, region, False)
+        return False
+    print(f"Checking: {package_name} (region: {region})... ⚠️ Unexpected Status: {status_code}")
+    metrics.VERIFY_OUTCOMES.inc(outcome="other")
+    return None
+
+def record_check_error(package_name, region, error):
+    print(f"Checking: {package_name} (region: {region})... Error: {error}")
+    metrics.VERIFY_OUTCOMES.inc(outcome="error")
+    return None
+
+class RegionVerdict:
+    """
+    The status decision of verify_package_status, fed one region check at a time (True / False /
+    None as returned by check_region, in any order). The requested region (regions_to_try[0]) wins
+    if it exists; otherwise the first other region to exist wins once the requested one has failed.
+    Shared by the sequential, parallel and async checks so they always agree.
+    """
+
+    def __init__(self, regions_to_try):
+        self.requested = regions_to_try[0]
+        self.found_region = None
+        self.requested_checked = False
+        self.unknown = False
+
+    def add(self, region, result):
+        """
+        Records the result of one region. Returns (status, region) once that decides it, None otherwise.
+        """
+        if region == self.requested:
+            self.requested_checked = True
+        if result is None:
+            self.unknown = True
+        elif result:
+            if region == self.requested:
+                return VERIFIED, region
+            if self.found_region is None:
+                self.found_region = region
+        if self.found_region and self.requested_checked:
+            return VERIFIED, self.found_region
+        return None
+
+    def result(self):
+        """
+        (status, region) once every region has been checked.
+        """
+        if self.found_region:
+            return VERIFIED, self.found_region
+        return (UNKNOWN if self.unknown else NOT_FOUND), None
+
+def _verify_regions_parallel(package_name, regions_to_try, timeout=None, use_cache=True, probe=None):
+    """
+    Probes every region at once and decides as soon as RegionVerdict can.
+    Probes that have not started yet are cancelled, running ones are left to finish in the background.
+    Returns (status, region) like verify_package_status.
     """
+    verdict = RegionVerdict(regions_to_try)
+    futures = {
+        metrics.submit(_region_executor, check_region, package_name, r, timeout, use_cache, probe): r
+        for r in regions_to_try
+    }
+    try:
+        for future in as_completed(futures):
+            decided = verdict.add(futures[future], future.result())
+            if decided:
+                return decided
+        return verdict.result()
+    finally:
+        for future in futures:
+            future.cancel()
+
+def regions_to_check(region, use_fallbacks=False):
     regions_to_try = [region]
     if use_fallbacks:
         # Expanding fallbacks to major global markets
@@ -148,33 +433,59 @@ def verify_package_exists(package_name, region="US", use_fallbacks=False):
         for f in fallbacks:
             if f not in regions_to_try:
                 regions_to_try.append(f)
+    return regions_to_try
 
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-    }
+def check_probe_mode(probe):
+    if probe is not None and probe not in play_transport.PROBE_MODES:
+        raise ValueError(f"Unknown probe mode: {probe} (expected one of {', '.join(play_transport.PROBE_MODES)})")
 
-    for r in regions_to_try:
-        url = f"https://play.google.com/store/apps/details?id={package_name}&gl={r}"
-        try:
-            print(f"Checking: {package_name} (region: {r})...", end=" ")
-            response = requests.get(url, headers=headers, timeout=10)
-            
-            if response.status_code == 200:
-                print("✅ Exists!")
-                return r
-            elif response.status_code == 404:
-                print("❌ Not Found (404)")
-            else:
-                print(f"⚠️ Unexpected Status: {response.status_code}")
-        except Exception as e:
-            print(f"Error: {e}")
-            
-    return None
+def verify_package_status(package_name, region="US", use_fallbacks=False, timeout=None, use_cache=True, parallel=None,
+                          probe=None):
+    """
+    Sends an HTTP GET request to the Google Play Store.
+    Returns (status, region): (VERIFIED, region code) if the app exists, (NOT_FOUND, None) if
+    every region answered 404, and (UNKNOWN, None) if some region could not be checked
+    (throttled / server / network error) and none answered 200.
+    200 / 404 answers are cached per (package, region) in verify_cache unless use_cache=False.
+    With use_fallbacks=True the fallback regions are probed concurrently unless
+    parallel=False (default: VERIFY_PARALLEL_FALLBACKS).
+    probe picks how much of the details page is fetched: "head", "stream" (status + headers only)
+    or "get" (whole page). Defaults to play_transport.PLAY_PROBE_MODE.
+    Identical calls already running in other threads are joined instead of repeated.
+    """
+    check_probe_mode(probe)
+    key = (package_name, region, use_fallbacks, timeout, use_cache, parallel, probe)
+    return verify_flight.do_deadline(key, (UNKNOWN, None), _verify_package_status, *key)
+
+def _verify_package_status(package_name, region, use_fallbacks, timeout, use_cache, parallel, probe):
+    regions_to_try = regions_to_check(region, use_fallbacks)
+
+    if parallel is None:
+        parallel = VERIFY_PARALLEL_FALLBACKS
+    with metrics.stage("verify"):
+        if parallel and len(regions_to_try) > 1:
+            return _verify_regions_parallel(package_name, regions_to_try, timeout=timeout, use_cache=use_cache, probe=probe)
+
+        verdict = RegionVerdict(regions_to_try)
+        for r in regions_to_try:
+            decided = verdict.add(r, check_region(package_name, r, timeout=timeout, use_cache=use_cache, probe=probe))
+            if decided:
+                return decided
+    return verdict.result()
+
+def verify_package_exists(package_name, region="US", use_fallbacks=False, timeout=None, use_cache=True, parallel=None,
+                          probe=None):
+    """
+    Returns the successful region code if the app exists, None otherwise (see verify_package_status).
+    """
+    return verify_package_status(package_name, region=region, use_fallbacks=use_fallbacks, timeout=timeout,
+                                 use_cache=use_cache, parallel=parallel, probe=probe)[1]
 
 def search_play_store_for_id(app_name, region="US"):
     """
     Uses google-play-scraper to find the ID (Free, fast).
     """
+    from google_play_scraper import search as scrapper_search
     try:
         results = scrapper_search(app_name, country=region, n_hits=1)
         if results:
@@ -183,78 +494,207 @@ def search_play_store_for_id(app_name, region="US"):
         print(f"Scraper Error: {e}")
     return None
 
-def get_package_by_name(query, region="US"):
+def get_package_by_name(query, region="US", timeout=None, max_ids=None):
     """
     Searches Play Store for a query and extracts package IDs from the results.
+    Returns at most max_ids (default SEARCH_MAX_IDS) IDs in order of appearance; the page is
+    parsed while it downloads and the rest of it is skipped once enough IDs were found.
+    Identical searches already running in other threads are joined instead of repeated.
     """
-    url = f"https://play.google.com/store/search?q={query}&c=apps&gl={region}"
-    
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-    }
-    
+    key = (query, region, timeout, max_ids)
+    return search_flight.do_deadline(key, [], _get_package_by_name, *key)
+
+def _get_package_by_name(query, region, timeout, max_ids):
+    extractor = PackageIdExtractor(max_ids)
     try:
-        response = requests.get(url, headers=headers, timeout=10)         
-        # Improved regex to catch both absolute and relative links
-        pattern = r"(?:/store/apps/details\?id=|https://play\.google\.com/store/apps/details\?id=)([a-zA-Z0-9._]+)"
-        
-        # Extract and deduplicate while preserving order of appearance
-        matches = re.findall(pattern, response.text)
-        package_names = []
-        seen = set()
-        for pkg in matches:
-            if pkg not in seen:
-                package_names.append(pkg)
-                seen.add(pkg)
-                print(f"Found Package Name: {pkg}")
-        
-        return package_names
+        with metrics.upstream("play_search"):
+            with play_transport.stream(search_url(query, region), timeout=timeout) as response:
+                if response.status_code != 200:
+                    print(f"Search for {query} returned status {response.status_code}")
+                    return []
+                for chunk in response.iter_content(SEARCH_CHUNK_SIZE):
+                    if extractor.feed(chunk):
+                        break
+        return log_package_ids(query, extractor.finish())
             
     except Exception as e:
         print(f"Error searching for {query}: {e}")
         return []
 
+def search_url(query, region):
+    return f"{play_transport.PLAY_STORE_BASE_URL}/store/search?q={query}&c=apps&gl={region}"
 
-def find_id_via_gemini(client, app_names, model_name):
-    print(f"   🤖 Asking Gemini to find ID for: {app_names[0]}...")
-    
-    prompt = f"""
-    Find the exact Google Play Store Package ID for the Android app "{app_names[0]}".
-    1. Use Google Search to find the official Play Store URL.
+# Both absolute and relative details links
+_PACKAGE_LINK_PATTERN = re.compile(rb"(?:/store/apps/details\?id=|https://play\.google\.com/store/apps/details\?id=)([a-zA-Z0-9._]+)")
+_PACKAGE_LINK_MAX_LENGTH = 320 # prefix + the longest package name Play allows
+
+class PackageIdExtractor:
+    """
+    Collects the package IDs linked from a search page while it streams in, deduplicated.
+    feed() returns True once max_ids unique IDs were found (max_ids=0: no limit); finish()
+    returns them in order of appearance.
+    """
+
+    def __init__(self, max_ids=None):
+        self.max_ids = SEARCH_MAX_IDS if max_ids is None else max_ids
+        self.package_names = []
+        self._seen = set()
+        self._tail = b""
+
+    def _add(self, match):
+        pkg = match.group(1).decode("ascii")
+        if pkg not in self._seen:
+            self._seen.add(pkg)
+            self.package_names.append(pkg)
+
+    def _full(self):
+        return bool(self.max_ids) and len(self.package_names) >= self.max_ids
+
+    def feed(self, chunk):
+        if self._full():
+            return True
+        data = self._tail + chunk
+        # A match that touches the end of the data may continue in the next chunk: keep it for later
+        for match in _PACKAGE_LINK_PATTERN.finditer(data):
+            if match.end() == len(data):
+                break
+            self._add(match)
+            if self._full():
+                return True
+        self._tail = data[-_PACKAGE_LINK_MAX_LENGTH:]
+        return False
+
+    def finish(self):
+        if not self._full():
+            for match in _PACKAGE_LINK_PATTERN.finditer(self._tail):
+                self._add(match)
+                if self._full():
+                    break
+            self._tail = b""
+        return list(self.package_names)
+
+def log_package_ids(query, package_names):
+    if package_names:
+        print(f"Found {len(package_names)} package name(s) for {query}: {', '.join(package_names)}")
+    return package_names
+
+def search_hit(pkg, region):
+    """
+    Marks a package ID taken from a live search listing as existing in region.
+    """
+    verify_cache.put(pkg, region, True)
+    return VERIFIED, region
+
+
+def strip_json_fences(text):
+    # Clean up markdown fences if present
+    if "```json" in text:
+        text = text.split("```json")[1].split("```")[0]
+    elif "```" in text:
+        text = text.split("```")[1].split("```")[0]
+    return text.strip()
+
+def _clean_package_id(value):
+    """
+    Normalizes a package ID returned by Gemini (plain ID or a Play Store URL). Returns None if invalid.
+    """
+    if not isinstance(value, str):
+        return None
+    value = value.strip()
+    if "id=" in value:
+        value = value.split("id=")[1].split("&")[0]
+    return value if PACKAGE_ID_PATTERN.match(value) else None
+
+def resolve_prompt(app_names):
+    example = {name: "com.example.app" for name in app_names[:2]}
+    return f"""
+    Find the exact Google Play Store Package ID for each of these Android apps:
+    {json.dumps(app_names, ensure_ascii=False)}
+    1. Use Google Search to find the official Play Store URL of every app.
     2. Extract the text after 'id='.
-    3. Return ONLY the package ID string (e.g., com.example.app). Do not write sentences.
+    3. Return ONLY a JSON object mapping every app name, exactly as given, to its package ID string (e.g., com.example.app). Use null if you cannot find it. Do not write sentences.
 
-    Required JSON Structure: {{"{app_names[0]}" : "com.example.app"}}
+    Required JSON Structure: {json.dumps(example, ensure_ascii=False)}
     """
-    
+
+def resolve_config():
+    from google.genai import types
+    return types.GenerateContentConfig(
+        temperature=0.0,
+        http_options=_gemini_http_options(90_000),
+        # Enable Google Search Tool
+        tools=[types.Tool(google_search=types.GoogleSearch())]
+    )
+
+def parse_resolve_text(text, app_names):
+    """
+    Turns Gemini's answer to resolve_prompt into {app_name: package_id or None}.
+    """
+    text = strip_json_fences(text)
     try:
-        response = client.models.generate_content(
-            model=model_name,
-            contents=prompt,
-            config=types.GenerateContentConfig(
-                temperature=0.0,
-                http_options=types.HttpOptions(timeout=90_000),
-                # Enable Google Search Tool
-                tools=[types.Tool(google_search=types.GoogleSearch())]
+        res = json.loads(text)
+    except ValueError:
+        res = text
+    if not isinstance(res, dict):
+        # Single-app prompts sometimes come back as a bare ID, quoted or not
+        return {app_names[0]: _clean_package_id(res)} if len(app_names) == 1 else {}
+
+    # Match returned keys back to the requested names (the model may change the casing)
+    by_lower = {str(k).strip().lower(): v for k, v in res.items()}
+    resolved = {}
+    for name in app_names:
+        value = res.get(name, by_lower.get(name.strip().lower()))
+        if value is None and len(app_names) == 1 and len(res) == 1:
+            value = list(res.values())[0]
+        resolved[name] = _clean_package_id(value)
+    return resolved
+
+def chunk_names(app_names, chunk_size=None):
+    names = list(dict.fromkeys(n for n in app_names if n))
+    chunk_size = max(1, chunk_size or GEMINI_RESOLVE_CHUNK_SIZE)
+    return names, [names[i:i + chunk_size] for i in range(0, len(names), chunk_size)]
+
+def _find_ids_chunk(client, app_names, model_name):
+    print(f"   🤖 Asking Gemini to find IDs for {len(app_names)} app(s): {', '.join(app_names)}...")
+    try:
+        with metrics.upstream("gemini"):
+            response = client.models.generate_content(
+                model=model_name,
+                contents=resolve_prompt(app_names),
+                config=resolve_config()
             )
-        )
-        text = response.text
-        # Clean up markdown fences
-        if "```json" in text:
-            text = text.split("```json")[1].split("```")[0]
-        elif "```" in text:
-            text = text.split("```")[1].split("```")[0]
-            
-        res = json.loads(text.strip())
-        # The user's prompt suggests getting back a dict
-        if isinstance(res, dict):
-            # Try to get the first value
-            return list(res.values())[0]
-        return text.strip()
-        
+        return parse_resolve_text(response.text, app_names)
     except Exception as e:
         print(f"Error: {e}")
+        return {}
+
+def find_ids_via_gemini(client, app_names, model_name, chunk_size=None):
+    """
+    Resolves many app names to package IDs with as few Gemini calls as possible.
+    Names are split into chunks of chunk_size (default GEMINI_RESOLVE_CHUNK_SIZE) that run concurrently.
+    Returns {app_name: package_id or None} for every unique name.
+    """
+    names, chunks = chunk_names(app_names, chunk_size)
+    if not names:
+        return {}
+
+    resolved = {}
+    if len(chunks) == 1:
+        resolved.update(_find_ids_chunk(client, chunks[0], model_name))
+    else:
+        with ThreadPoolExecutor(max_workers=min(len(chunks), GEMINI_RESOLVE_MAX_WORKERS), thread_name_prefix="gemini-resolve") as executor:
+            futures = [metrics.submit(executor, _find_ids_chunk, client, chunk, model_name) for chunk in chunks]
+            for future in futures:
+                resolved.update(future.result())
+    return {name: resolved.get(name) for name in names}
+
+def find_id_via_gemini(client, app_names, model_name):
+    """
+    Resolves a single app name (app_names[0]). Kept for /api/ai-resolve; use find_ids_via_gemini for many names.
+    """
+    if not app_names:
         return None
+    return find_ids_via_gemini(client, app_names[:1], model_name).get(app_names[0])
 
 def list_supported_models(client):
     """
@@ -262,7 +702,8 @@ def list_supported_models(client):
     """
     try:
         print("Fetching models from Gemini API...")
-        models = list(client.models.list())
+        with metrics.upstream("gemini_models"):
+            models = list(client.models.list())
         print(f"Found {len(models)} models total.")
         
         # Log some for debugging
@@ -282,72 +723,236 @@ def list_supported_models(client):
         print(f"Error listing models: {e}")
         return []
 
+class AppNotFoundError(LookupError):
+    """
+    Play Store has no app with this package ID in the requested region.
+    """
+
 def get_app_details(package_id, region="US"):
     """
     Fetches app details from Google Play Store using google_play_scraper.
+    Returns None when the app does not exist or the lookup failed (see fetch_app_details).
     """
-    from google_play_scraper import app as play_app
     try:
-        details = play_app(
-            package_id,
-            lang='en', # defaults to 'en'
-            country=region.lower() if region else 'us'
-        )
-        return details
+        return fetch_app_details(package_id, region)
     except Exception as e:
         print(f"Error fetching app details for {package_id}: {e}")
         return None
 
-def process_results(raw_apps, region, resolve_with_ai, client, model_name, category=""):
+def fetch_app_details(package_id, region="US", use_cache=True):
     """
-    Main orchestration logic.
+    get_app_details that raises instead of returning None: AppNotFoundError for a missing app,
+    the scraper's own exception for anything else.
+    Results and "not found" answers are cached in details_cache unless use_cache=False.
+    Identical lookups already running in other threads are joined instead of repeated.
     """
-    processed_list = []
+    if use_cache:
+        hit, details = cached_app_details(package_id, region)
+        if hit:
+            return details
+    return details_flight.do((package_id, region), scrape_app_details, package_id, region)
+
+def cached_app_details(package_id, region):
+    # (hit, details) from details_cache; a cached "not found" raises AppNotFoundError
+    hit, details = details_cache.get(package_id, region)
+    if hit and details is None:
+        raise AppNotFoundError(f"App not found: {package_id}")
+    return hit, details
+
+def scrape_app_details(package_id, region):
+    from google_play_scraper import app as scrapper_app
+    from google_play_scraper.exceptions import NotFoundError as ScraperNotFoundError
+    try:
+        with metrics.upstream("play_scraper"):
+            details = scrapper_app(
+                package_id,
+                lang='en', # defaults to 'en'
+                country=region.lower() if region else 'us'
+            )
+    except ScraperNotFoundError as e:
+        details_cache.put(package_id, region, None)
+        raise AppNotFoundError(f"App not found: {package_id}") from e
+    details_cache.put(package_id, region, details)
+    return details
+
+def project_fields(details, fields=None):
+    """
+    Keeps only the requested keys of an app details dict (missing keys come back as None).
+    """
+    if not fields:
+        return details
+    return {field: details.get(field) for field in fields}
+
+def get_single_flight_stats():
+    """
+    Calls made / coalesced per single-flight group (verify, search, app_details).
+    """
+    return {flight.name: flight.get_stats() for flight in (verify_flight, search_flight, details_flight)}
+
+def _default_upstream(upstream):
+    # The module-level functions are the default upstream. Callers (e.g. batch_jobs) may pass any
+    # object exposing verify_package_status / get_package_by_name / find_ids_via_gemini instead.
+    return upstream if upstream is not None else sys.modules[__name__]
+
+def verify_or_search_steps(app, region, category=""):
+    """
+    The decisions of the first part of the chain for one app - verify the AI's guess, then fall back
+    to a Play Store search - without the I/O, so the threaded and async pipelines share them.
+    A generator: yields the upstream call to make next, ("verify", pkg) / ("search", query) /
+    ("search_hit", pkg), is sent its result, and returns (pkg, status, working_region, path) -
+    path is "initial_guess" or "web_search", or None when the search found nothing. A guess that
+    could not be checked (UNKNOWN) is not searched for: it is most likely a real app behind a
+    throttled request. Run it with run_steps (async_scraper.run_steps).
+    """
+    pkg = app.get('package')
+    name = app.get('name')
     
-    for app in raw_apps:
-        pkg = app.get('package')
-        name = app.get('name')
-        status = "Verified"
-        
-        # 1. Verify the AI's initial guess
-        print(f"🔍 Checking: {name} - {pkg}...")
-        working_region = verify_package_exists(pkg, region=region)
-        if not working_region:
-            print(f"❌ Initial package {pkg} failed. Searching...")            
-            search_query = f"{name} ({category})" if category else name
-            pkgs = get_package_by_name(search_query, region=region)
-            if len(pkgs)>0:
-                print(f"✅ Found via web search: {pkgs[0]}")
-                pkg = pkgs[0]
-                working_region = verify_package_exists(pkg, region=region) # Check again with working search result
-                status = "Verified" if working_region else "Not Found"
-            elif resolve_with_ai:
-                ai_pkg = find_id_via_gemini(client, [name], model_name)
-                working_region = verify_package_exists(ai_pkg, region=region) if ai_pkg else None
-                if working_region:
-                    print(f"✅ Found via AI: {ai_pkg}")
-                    pkg = ai_pkg
-                    status = "Verified"
-                else:
-                    print(f"❌ Not Found via AI: {name}")
-                    status = "Not Found"
-            else:
-                status = "Not Found"
-        else:
-            status = "Verified"
-        
-        # Use fallback region if primary failed
-        effective_region = working_region if working_region else region
-        
-        app['package'] = pkg
-        app['status'] = status
-        app['region'] = effective_region # Store the working region
-        
-        if status == "Verified":
-            app['play_store_url'] = f"https://play.google.com/store/apps/details?id={pkg}&gl={effective_region}"
+    # 1. Verify the AI's initial guess
+    print(f"🔍 Checking: {name} - {pkg}...")
+    status, working_region = yield "verify", pkg
+    if status == VERIFIED:
+        return pkg, status, working_region, "initial_guess"
+    if status == UNKNOWN:
+        print(f"⚠️ Could not check {pkg} right now, keeping it as Unknown.")
+        return pkg, status, None, "initial_guess"
+
+    print(f"❌ Initial package {pkg} failed. Searching...")            
+    search_query = f"{name} ({category})" if category else name
+    pkgs = yield "search", search_query
+    if len(pkgs)>0:
+        print(f"✅ Found via web search: {pkgs[0]}")
+        pkg = pkgs[0]
+        if SEARCH_RESULTS_VERIFIED:
+            status, working_region = yield "search_hit", pkg
         else:
-            search_query = f"{name} ({category})" if category else name
-            app['play_store_url'] = f"https://play.google.com/store/search?q={search_query}&c=apps&gl={region}"
-        processed_list.append(app)
-        
-    return processed_list
\ No newline at end of file
+            status, working_region = yield "verify", pkg # Check again with working search result
+        return pkg, status, working_region, "web_search"
+    return pkg, NOT_FOUND, None, None
+
+def ai_candidate_steps(app, ai_pkg):
+    """
+    Last part of the chain, as steps like verify_or_search_steps: verify the package ID Gemini
+    suggested for an app. Returns (pkg, status, working_region).
+    """
+    status, working_region = (yield "verify", ai_pkg) if ai_pkg else (NOT_FOUND, None)
+    if status == VERIFIED:
+        print(f"✅ Found via AI: {ai_pkg}")
+        return ai_pkg, status, working_region
+    if status == UNKNOWN:
+        print(f"⚠️ Could not check AI suggestion {ai_pkg} right now, keeping it as Unknown.")
+        return ai_pkg, status, None
+    print(f"❌ Not Found via AI: {app.get('name')}")
+    return app.get('package'), status, None
+
+def run_steps(steps, region, upstream=None):
+    """
+    Runs a verify_or_search_steps / ai_candidate_steps generator, making its calls through upstream
+    (verify_package_status / get_package_by_name, default: this module). Returns its result.
+    """
+    upstream = _default_upstream(upstream)
+    result = None
+    try:
+        while True:
+            call, arg = steps.send(result)
+            if call == "verify":
+                result = upstream.verify_package_status(arg, region=region)
+            elif call == "search":
+                with metrics.stage("web_search"):
+                    result = upstream.get_package_by_name(arg, region=region)
+            else:
+                result = search_hit(arg, region)
+    except StopIteration as done:
+        return done.value
+
+def status_label(status):
+    # metrics label for a status: "verified" / "not_found" / "unknown"
+    return status.lower().replace(" ", "_")
+
+def finish_app(app, pkg, working_region, region, category="", status=None):
+    """
+    Writes the final package / status / region / URL fields onto the app entry.
+    status defaults to VERIFIED / NOT_FOUND depending on working_region.
+    """
+    name = app.get('name')
+    if status is None:
+        status = VERIFIED if working_region else NOT_FOUND
+    
+    # Use fallback region if primary failed
+    effective_region = working_region if working_region else region
+    
+    app['package'] = pkg
+    app['status'] = status
+    app['region'] = effective_region # Store the working region
+    
+    if status in (VERIFIED, UNKNOWN, PENDING):
+        app['play_store_url'] = f"https://play.google.com/store/apps/details?id={pkg}&gl={effective_region}"
+    else:
+        search_query = f"{name} ({category})" if category else name
+        app['play_store_url'] = f"https://play.google.com/store/search?q={search_query}&c=apps&gl={region}"
+    return app
+
+def iter_process_results(raw_apps, region, resolve_with_ai, client, model_name, category="", max_workers=None, upstream=None):
+    """
+    Same work as process_results, but yields (index, app) as soon as each app is done
+    (completion order, not input order). index is the position of the app in raw_apps.
+    Apps that still need Gemini are resolved together in one batched call after the
+    verify / search pass, so they are yielded last.
+    Closing the generator early cancels apps that have not started yet.
+    """
+    upstream = _default_upstream(upstream)
+    if max_workers is None:
+        max_workers = PROCESS_MAX_WORKERS
+    max_workers = max(1, min(max_workers, len(raw_apps) or 1))
+
+    def first_pass(app):
+        return run_steps(verify_or_search_steps(app, region, category=category), region, upstream)
+
+    def ai_pass(app, ai_pkg):
+        return run_steps(ai_candidate_steps(app, ai_pkg), region, upstream)
+
+    executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="verify")
+    try:
+        # 1. Verify every guess, falling back to Play Store search
+        needs_ai = []
+        futures = {metrics.submit(executor, first_pass, app): index for index, app in enumerate(raw_apps)}
+        for future in as_completed(futures):
+            index = futures[future]
+            app = raw_apps[index]
+            pkg, status, working_region, path = future.result()
+            if path is None and resolve_with_ai:
+                needs_ai.append(index)
+                continue
+            metrics.RESOLVE_PATHS.inc(path=path or "web_search", status=status_label(status))
+            yield index, finish_app(app, pkg, working_region, region, category=category, status=status)
+
+        if not needs_ai:
+            return
+
+        # 2. One batched Gemini lookup for everything search could not find
+        with metrics.stage("ai_resolve"):
+            ai_ids = upstream.find_ids_via_gemini(client, [raw_apps[i].get('name') for i in needs_ai], model_name)
+        futures = {
+            metrics.submit(executor, ai_pass, raw_apps[i], ai_ids.get(raw_apps[i].get('name'))): i
+            for i in needs_ai
+        }
+        for future in as_completed(futures):
+            index = futures[future]
+            pkg, status, working_region = future.result()
+            metrics.RESOLVE_PATHS.inc(path="ai", status=status_label(status))
+            yield index, finish_app(raw_apps[index], pkg, working_region, region, category=category, status=status)
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+def process_results(raw_apps, region, resolve_with_ai, client, model_name, category="", max_workers=None, upstream=None):
+    """
+    Main orchestration logic.
+    Apps are verified concurrently on a bounded thread pool (max_workers, defaults to
+    PROCESS_MAX_WORKERS). Pass max_workers=1 to run sequentially.
+    The returned list keeps the same order as raw_apps.
+    """
+    processed_list = [None] * len(raw_apps)
+    with metrics.stage("process_results"):
+        for index, app in iter_process_results(raw_apps, region, resolve_with_ai, client, model_name,
+                                               category=category, max_workers=max_workers, upstream=upstream):
+            processed_list[index] = app
+    return processed_list
@@ -0,0 +1,140 @@
+import asyncio
+import copy
+import threading
+import weakref
+from concurrent.futures import Future
+import deadlines
+import metrics
+
+# Coalesces concurrent identical upstream calls: the first caller for a key runs the call,
+# callers arriving while it is in flight wait for it and get (a copy of) the same result.
+# Nothing is cached once the call has finished - that is verify_cache / research_cache's job.
+# Threads share calls with threads, coroutines with coroutines on the same event loop.
+# Calls made under a request deadline (deadlines.scope) go through do_deadline / ado_deadline, so
+# callers with different deadlines still share one call but never a result cut short by another
+# caller's deadline.
+
+
+class SingleFlight:
+    def __init__(self, name):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls = {}  # key -> concurrent.futures.Future
+        self._async_calls = weakref.WeakKeyDictionary()  # event loop -> {key: asyncio.Future}
+        self.calls = 0
+        self.coalesced = 0
+
+    def _count(self, owner):
+        with self._lock:
+            if owner:
+                self.calls += 1
+            else:
+                self.coalesced += 1
+        if not owner:
+            metrics.COALESCED_CALLS.inc(call=self.name)
+
+    def do(self, key, fn, *args, **kwargs):
+        """
+        Runs fn(*args, **kwargs) unless a call with the same key is already running in another
+        thread, in which case its result (or exception) is shared.
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            owner = future is None
+            if owner:
+                future = self._calls[key] = Future()
+        self._count(owner)
+        if not owner:
+            return copy.deepcopy(future.result())
+
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+    async def ado(self, key, fn, *args, **kwargs):
+        """
+        Async do(): awaits fn(*args, **kwargs) unless the same key is already in flight on this loop.
+        If the running call is cancelled, a waiter takes over and runs the call itself.
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            calls = self._async_calls.get(loop)
+            if calls is None:
+                calls = self._async_calls[loop] = {}
+
+        while key in calls:
+            future = calls[key]
+            self._count(False)
+            try:
+                return copy.deepcopy(await asyncio.shield(future))
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise # this waiter was cancelled, not the call it was waiting for
+
+        future = calls[key] = loop.create_future()
+        self._count(True)
+        try:
+            result = await fn(*args, **kwargs)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception() # retrieved: no "never retrieved" warning when nobody was waiting
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            calls.pop(key, None)
+
+    def do_deadline(self, key, cut_short, fn, *args):
+        """
+        do(key, fn, *args) for a call that answers cut_short (e.g. Unknown, no results) when the
+        request deadline stops it. Callers are joined whatever their deadlines; when the shared call
+        was cut short by its owner's deadline, a waiter that still has time runs it again, and a
+        caller whose own deadline has passed gets cut_short.
+        """
+        def run(*args):
+            result = fn(*args)
+            # Cut short because the owner's deadline passed: raised, so waiters don't take it as the answer
+            if result == cut_short and deadlines.remaining() == 0:
+                raise deadlines.DeadlineExceeded("Request deadline exceeded")
+            return result
+
+        while True:
+            try:
+                return self.do(key, run, *args)
+            except deadlines.DeadlineExceeded:
+                if deadlines.remaining() == 0:
+                    return copy.deepcopy(cut_short)
+
+    async def ado_deadline(self, key, cut_short, fn, *args):
+        """
+        Async do_deadline().
+        """
+        async def run(*args):
+            result = await fn(*args)
+            if result == cut_short and deadlines.remaining() == 0:
+                raise deadlines.DeadlineExceeded("Request deadline exceeded")
+            return result
+
+        while True:
+            try:
+                return await self.ado(key, run, *args)
+            except deadlines.DeadlineExceeded:
+                if deadlines.remaining() == 0:
+                    return copy.deepcopy(cut_short)
+
+    def get_stats(self):
+        with self._lock:
+            in_flight = len(self._calls) + sum(len(calls) for calls in self._async_calls.values())
+            return {"calls": self.calls, "coalesced": self.coalesced, "in_flight": in_flight}
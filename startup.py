@@ -0,0 +1,149 @@
+"""
+Cold start bookkeeping for the service: how long the process took from exec to import Main, to
+the app being built and to ready (startup hooks done), plus optional warm-up of the SDKs that
+are imported lazily on first use.
+
+Warm-up (STARTUP_WARMUP): "background" (default) loads them in a daemon thread once the app is
+ready, so readiness is not delayed but the first requests usually find them loaded; "blocking"
+loads them before the app reports ready; "off" leaves them to the first request that needs them.
+
+    python startup.py            # import-time report of Main (python -X importtime), slowest first
+    python startup.py --top 40
+    GET /api/startup-profile     # the running process's own profile
+"""
+import importlib
+import os
+import sys
+import threading
+import time
+
+STARTUP_WARMUP = os.environ.get("STARTUP_WARMUP", "background")
+# Imported lazily by scraper_logic / genai_clients / play_transport
+WARMUP_MODULES = ("google.genai", "google.genai.types", "google_play_scraper", "requests", "httpx")
+
+_started = time.perf_counter()  # Main imports this module first
+_lock = threading.Lock()
+_phases = {}  # phase name -> seconds since _started
+_warmup = {"mode": STARTUP_WARMUP, "done": False, "seconds": None, "modules": {}, "errors": {}}
+
+
+def _process_age():
+    # Seconds since the process was exec'd (Linux /proc), None where that is not available
+    try:
+        with open("/proc/self/stat", "rb") as f:
+            start_ticks = int(f.read().rsplit(b")", 1)[1].split()[19])
+        with open("/proc/uptime", "rb") as f:
+            uptime = float(f.read().split()[0])
+        return max(0.0, uptime - start_ticks / os.sysconf("SC_CLK_TCK"))
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+# Interpreter start-up before this module was imported
+_preimport = _process_age()
+
+
+def mark(phase):
+    """
+    Records that phase (e.g. "imports", "app", "ready") finished now.
+    """
+    with _lock:
+        _phases.setdefault(phase, time.perf_counter() - _started)
+
+
+def warm_up():
+    """
+    Imports WARMUP_MODULES and builds the Play Store session. Safe to call more than once.
+    """
+    started = time.perf_counter()
+    for name in WARMUP_MODULES:
+        if name in sys.modules:
+            continue
+        module_started = time.perf_counter()
+        try:
+            importlib.import_module(name)
+        except Exception as e:
+            _warmup["errors"][name] = str(e)
+            continue
+        _warmup["modules"][name] = round(time.perf_counter() - module_started, 4)
+    import play_transport
+    play_transport.get_session()
+    _warmup["seconds"] = round(time.perf_counter() - started, 4)
+    _warmup["done"] = True
+
+
+def on_startup():
+    """
+    App startup hook: runs the STARTUP_WARMUP warm-up and marks the process ready.
+    """
+    if STARTUP_WARMUP == "blocking":
+        warm_up()
+    elif STARTUP_WARMUP == "background":
+        threading.Thread(target=warm_up, name="startup-warmup", daemon=True).start()
+    mark("ready")
+
+
+def get_report():
+    with _lock:
+        phases = {name: round(seconds, 4) for name, seconds in _phases.items()}
+    report = {
+        "interpreter_s": round(_preimport, 4) if _preimport is not None else None,
+        "phases_s": phases,
+        "process_to_ready_s": None,
+        "uptime_s": round(time.perf_counter() - _started, 1),
+        "warmup": dict(_warmup, modules=dict(_warmup["modules"]), errors=dict(_warmup["errors"])),
+        "lazy_modules_loaded": {name: name in sys.modules for name in WARMUP_MODULES},
+        "modules_loaded": len(sys.modules),
+    }
+    if "ready" in phases and _preimport is not None:
+        report["process_to_ready_s"] = round(_preimport + phases["ready"], 4)
+    return report
+
+
+def get_stats():
+    # Numeric view for /metrics
+    report = get_report()
+    stats = {f"{name}_seconds": seconds for name, seconds in report["phases_s"].items()}
+    if report["process_to_ready_s"] is not None:
+        stats["process_to_ready_seconds"] = report["process_to_ready_s"]
+    if report["warmup"]["seconds"] is not None:
+        stats["warmup_seconds"] = report["warmup"]["seconds"]
+    return stats
+
+
+def import_time_report(module="Main", top=25):
+    """
+    Runs python -X importtime -c "import <module>" in a fresh interpreter (from the repo root) and
+    returns (total seconds, [(cumulative seconds, self seconds, module name)] slowest first).
+    """
+    import subprocess
+    root = os.path.dirname(os.path.abspath(__file__))
+    output = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], cwd=root,
+                            capture_output=True, text=True, check=True).stderr
+    rows = []
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        fields = line[len("import time:"):].split("|")
+        try:
+            self_us, cumulative_us = int(fields[0]), int(fields[1])
+        except ValueError:
+            continue  # header line
+        rows.append((cumulative_us / 1e6, self_us / 1e6, fields[2].rstrip()))
+    total = next((row[0] for row in rows if row[2].strip() == module), None)
+    rows.sort(reverse=True)
+    return total, rows[:top]
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="Main")
+    parser.add_argument("--top", type=int, default=25)
+    args = parser.parse_args()
+    total, rows = import_time_report(args.module, args.top)
+    print(f"import {args.module}: {total * 1000:.1f} ms" if total is not None else f"import {args.module}")
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    for cumulative, own, name in rows:
+        print(f"{cumulative * 1000:>14.1f} {own * 1000:>9.1f}  {name}")
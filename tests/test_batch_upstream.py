@@ -0,0 +1,36 @@
+import scraper_logic
+from batch_jobs import BatchUpstream
+
+
+def test_unknown_status_is_asked_again(monkeypatch):
+    answers = [(scraper_logic.UNKNOWN, None), (scraper_logic.VERIFIED, "US")]
+    monkeypatch.setattr(scraper_logic, "verify_package_status", lambda pkg, region="US": answers.pop(0))
+    upstream = BatchUpstream()
+    assert upstream.verify_package_status("com.example.app")[0] == scraper_logic.UNKNOWN
+    assert upstream.verify_package_status("com.example.app") == (scraper_logic.VERIFIED, "US")
+    assert upstream.verify_package_status("com.example.app") == (scraper_logic.VERIFIED, "US")
+    assert upstream.get_stats() == {"upstream_calls": 2, "deduped_calls": 1}
+
+
+def test_empty_search_is_asked_again(monkeypatch):
+    answers = [[], ["com.example.app"]]
+    monkeypatch.setattr(scraper_logic, "get_package_by_name", lambda query, region="US": answers.pop(0))
+    upstream = BatchUpstream()
+    assert upstream.get_package_by_name("Alpha") == []
+    assert upstream.get_package_by_name("Alpha") == ["com.example.app"]
+    assert upstream.get_package_by_name("Alpha") == ["com.example.app"]
+    assert upstream.get_stats() == {"upstream_calls": 2, "deduped_calls": 1}
+
+
+def test_unresolved_names_are_asked_again(monkeypatch):
+    asked = []
+
+    def find_ids(client, names, model_name):
+        asked.append(list(names))
+        return {"Alpha": "com.example.alpha"}
+
+    monkeypatch.setattr(scraper_logic, "find_ids_via_gemini", find_ids)
+    upstream = BatchUpstream()
+    assert upstream.find_ids_via_gemini(None, ["Alpha", "Beta"], "model") == {"Alpha": "com.example.alpha", "Beta": None}
+    assert upstream.find_ids_via_gemini(None, ["Alpha", "Beta"], "model") == {"Alpha": "com.example.alpha", "Beta": None}
+    assert asked == [["Alpha", "Beta"], ["Beta"]]
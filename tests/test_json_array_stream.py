@@ -0,0 +1,107 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+import async_scraper
+import research_cache
+import scraper_logic
+from scraper_logic import JsonArrayStream
+
+APPS = [{"name": "Alpha", "package": "com.example.alpha"}, {"name": "Beta [Pro]", "package": "com.example.beta"}]
+
+
+def feed_all(text, size=None):
+    parser = JsonArrayStream()
+    size = size or len(text) or 1
+    objects = []
+    for start in range(0, len(text), size):
+        objects.extend(parser.feed(text[start:start + size]))
+    return objects, parser.done
+
+
+def test_plain_array():
+    assert feed_all(json.dumps(APPS)) == (APPS, True)
+
+
+def test_fenced_array_after_prose_with_citations():
+    text = "Based on search [1], here:\n```json\n" + json.dumps(APPS, indent=2) + "\n```\nSee also [2]."
+    assert feed_all(text) == (APPS, True)
+
+
+def test_array_after_prose_without_fence():
+    text = "Sources [1][2] list these apps: [ \n {" + json.dumps(APPS)[2:]
+    assert feed_all(text) == (APPS, True)
+
+
+def test_any_chunk_size():
+    text = "Based on search [1], here:\n```json\n" + json.dumps(APPS, indent=2) + "\n```"
+    for size in (1, 2, 3, 7):
+        assert feed_all(text, size) == (APPS, True)
+
+
+def test_objects_are_returned_as_they_complete():
+    parser = JsonArrayStream()
+    assert parser.feed('[{"name": "Alpha", "package": "com.example.alpha"}, {"name": "Be') == [APPS[0]]
+    assert not parser.done
+    assert parser.feed('ta [Pro]", "package": "com.example.beta"}]') == [APPS[1]]
+    assert parser.done
+
+
+def test_text_after_the_array_is_ignored():
+    assert feed_all(json.dumps(APPS) + "\n[{\"name\": \"Gamma\"}]") == (APPS, True)
+
+
+def test_malformed_entry_is_skipped():
+    assert feed_all('[{"name": "Alpha", "package": "com.example.alpha"}, {"name": oops}]') == ([APPS[0]], True)
+
+
+def test_prose_only():
+    assert feed_all("No apps found for [1] this topic.") == ([], False)
+
+
+class FakeStreamClient:
+    def __init__(self, chunks):
+        async def generate_content_stream(**kwargs):
+            async def stream():
+                for chunk in chunks:
+                    yield SimpleNamespace(text=chunk)
+            return stream()
+        self.aio = SimpleNamespace(models=SimpleNamespace(generate_content_stream=generate_content_stream))
+
+
+def research(topic, chunks):
+    async def collect():
+        return [app async for app in async_scraper.iter_market_research(topic, "US", FakeStreamClient(chunks), "model")]
+    return asyncio.run(collect())
+
+
+def chunked(text, size=5):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+@pytest.fixture(autouse=True)
+def no_genai_config(monkeypatch):
+    monkeypatch.setattr(scraper_logic, "market_research_config", lambda model_name: None)
+    research_cache.clear()
+
+
+def test_iter_market_research_streams_fenced_reply():
+    text = "Based on search [1], here:\n```json\n" + json.dumps(APPS) + "\n```"
+    assert research("fenced topic", chunked(text)) == APPS
+    assert research_cache.get("fenced topic", "US", "model")[0] == APPS
+
+
+def test_iter_market_research_falls_back_to_whole_text():
+    # The prose "[{...}]" is taken for the array and ends it with nothing parsed; the fenced list is
+    # still found by the whole-text parse
+    text = "Results [{see below}]:\n```json\n" + json.dumps(APPS) + "\n```"
+    assert research("fallback topic", chunked(text)) == APPS
+    assert research_cache.get("fallback topic", "US", "model")[0] == APPS
+
+
+def test_iter_market_research_fallback_without_objects():
+    # A list of strings is no app list: nothing is yielded and nothing is cached
+    assert research("strings topic", ["```json\n", '["com.example.alpha",', ' "com.example.beta"]\n```']) == []
+    assert research_cache.get("strings topic", "US", "model") is None
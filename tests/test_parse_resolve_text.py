@@ -0,0 +1,24 @@
+import pytest
+
+from scraper_logic import parse_resolve_text
+
+
+@pytest.mark.parametrize("text", [
+    '"com.example.app"',
+    "com.example.app",
+    '```json\n"com.example.app"\n```',
+    '"https://play.google.com/store/apps/details?id=com.example.app&hl=en"',
+    '{"alpha": "com.example.app"}',
+])
+def test_single_app_answers(text):
+    assert parse_resolve_text(text, ["Alpha"]) == {"Alpha": "com.example.app"}
+
+
+def test_bare_id_is_not_used_for_several_apps():
+    assert parse_resolve_text('"com.example.app"', ["Alpha", "Beta"]) == {}
+
+
+def test_several_apps():
+    text = '{"Alpha": "com.example.alpha", "beta": null, "Gamma": "not an id"}'
+    assert parse_resolve_text(text, ["Alpha", "Beta", "Gamma"]) == {
+        "Alpha": "com.example.alpha", "Beta": None, "Gamma": None}
@@ -0,0 +1,38 @@
+import asyncio
+
+import pytest
+
+import play_transport
+from benchmarks.play_store_stub import PlayStoreStub
+
+
+@pytest.fixture
+def stub():
+    with PlayStoreStub(latency=0, detail_page_bytes=1_000) as stub:
+        yield stub
+
+
+def probe_both(url):
+    async def aprobe():
+        try:
+            return await play_transport.aprobe(url, mode="head", retries=0)
+        finally:
+            await play_transport.aclose()
+    return play_transport.probe(url, mode="head", retries=0), asyncio.run(aprobe())
+
+
+@pytest.mark.parametrize("package, status", [("com.stub.app", 200), ("missing.app", 404)])
+def test_head_answer_is_used(stub, package, status):
+    assert probe_both(f"{stub.base_url}/store/apps/details?id={package}") == (status, status)
+    assert stub.stats["heads"] == 2
+    assert stub.stats["details"] == 2
+
+
+@pytest.mark.parametrize("package, status", [("com.stub.app", 200), ("missing.app", 404)])
+def test_other_head_answer_falls_back_to_get(stub, package, status):
+    stub.head_status = 405
+    fallbacks = play_transport.get_stats()["head_fallbacks"]
+    assert probe_both(f"{stub.base_url}/store/apps/details?id={package}") == (status, status)
+    assert stub.stats["heads"] == 2
+    assert stub.stats["details"] == 2
+    assert play_transport.get_stats()["head_fallbacks"] == fallbacks + 2
@@ -0,0 +1,16 @@
+import pytest
+
+import research_cache
+
+
+@pytest.mark.parametrize("apps", [[], {"name": "Alpha"}, ["com.example.alpha"], [{"name": "Alpha"}, "com.example.beta"]])
+def test_put_skips_anything_but_a_list_of_apps(apps):
+    research_cache.clear()
+    research_cache.put("topic", "US", "model", apps)
+    assert research_cache.get("topic", "US", "model") is None
+
+
+def test_put_stores_a_list_of_apps():
+    research_cache.clear()
+    research_cache.put("topic", "US", "model", [{"name": "Alpha"}])
+    assert research_cache.get("topic", "US", "model")[0] == [{"name": "Alpha"}]
@@ -0,0 +1,76 @@
+import asyncio
+import threading
+import time
+
+import deadlines
+from single_flight import SingleFlight
+
+UNKNOWN = ("Unknown", None)
+
+
+def slow_check(calls, seconds=0.3):
+    # Answers Verified after seconds, or Unknown if the caller's deadline comes first
+    def check(package):
+        calls.append(package)
+        left = deadlines.remaining()
+        if left is not None and left < seconds:
+            time.sleep(left)
+            return UNKNOWN
+        time.sleep(seconds)
+        return ("Verified", "US")
+    return check
+
+
+def run_threads(flight, check, budgets):
+    results = {}
+
+    def call(name, budget, delay):
+        time.sleep(delay)
+        with deadlines.scope(deadlines.after(budget)):
+            results[name] = flight.do_deadline(("com.example.app",), UNKNOWN, check, "com.example.app")
+
+    threads = [threading.Thread(target=call, args=(name, budget, i * 0.05)) for i, (name, budget) in enumerate(budgets)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_callers_with_different_deadlines_share_one_call():
+    flight, calls = SingleFlight("test"), []
+    results = run_threads(flight, slow_check(calls), [("a", 30), ("b", 20), ("c", None)])
+    assert set(results.values()) == {("Verified", "US")}
+    assert len(calls) == 1
+
+
+def test_answer_cut_short_by_owner_deadline_is_not_shared():
+    flight, calls = SingleFlight("test"), []
+    results = run_threads(flight, slow_check(calls), [("short", 0.1), ("full", None)])
+    assert results == {"short": UNKNOWN, "full": ("Verified", "US")}
+    assert len(calls) == 2
+
+
+def test_async_answer_cut_short_by_owner_deadline_is_not_shared():
+    flight, calls = SingleFlight("test"), []
+
+    async def check(package):
+        calls.append(package)
+        try:
+            await asyncio.wait_for(asyncio.sleep(0.3), deadlines.remaining())
+        except asyncio.TimeoutError:
+            return UNKNOWN
+        return ("Verified", "US")
+
+    async def call(budget, delay):
+        await asyncio.sleep(delay)
+        with deadlines.scope(deadlines.after(budget)):
+            return await flight.ado_deadline(("com.example.app",), UNKNOWN, check, "com.example.app")
+
+    async def main():
+        return await asyncio.gather(call(0.1, 0), call(None, 0.05), call(20, 0.05))
+
+    short, full, other = asyncio.run(main())
+    assert short == UNKNOWN
+    assert full == other == ("Verified", "US")
+    assert len(calls) == 2
@@ -0,0 +1,106 @@
+import asyncio
+
+import pytest
+
+import async_scraper
+import scraper_logic
+from scraper_logic import NOT_FOUND, UNKNOWN, VERIFIED, RegionVerdict
+
+REGIONS = ["IL", "US", "IN"]
+
+
+def decide(results):
+    # Feeds (region, result) pairs in the given order like the parallel checks do
+    verdict = RegionVerdict(REGIONS)
+    for region, result in results:
+        decided = verdict.add(region, result)
+        if decided:
+            return decided
+    return verdict.result()
+
+
+@pytest.mark.parametrize("results, expected", [
+    ([("US", True), ("IL", True)], (VERIFIED, "IL")),
+    ([("US", True), ("IN", True), ("IL", False)], (VERIFIED, "US")),
+    ([("IL", False), ("IN", True), ("US", True)], (VERIFIED, "IN")),
+    ([("IL", None), ("US", False), ("IN", False)], (UNKNOWN, None)),
+    ([("IL", False), ("US", False), ("IN", False)], (NOT_FOUND, None)),
+    ([("US", True), ("IL", None)], (VERIFIED, "US")),
+])
+def test_region_verdict(results, expected):
+    assert decide(results) == expected
+
+
+class FakeUpstream:
+    def __init__(self, statuses, search=()):
+        self.statuses = statuses
+        self.search = list(search)
+        self.calls = []
+
+    def verify_package_status(self, pkg, region="US"):
+        self.calls.append(("verify", pkg))
+        return self.statuses.get(pkg, (NOT_FOUND, None))
+
+    def get_package_by_name(self, query, region="US"):
+        self.calls.append(("search", query))
+        return self.search
+
+
+class AsyncFakeUpstream(FakeUpstream):
+    async def verify(self, pkg, region="US"):
+        return FakeUpstream.verify_package_status(self, pkg, region)
+
+    async def search_by_name(self, query, region="US", timeout=None, max_ids=None):
+        return FakeUpstream.get_package_by_name(self, query, region)
+
+
+def run_both(monkeypatch, upstream, make_steps):
+    sync = scraper_logic.run_steps(make_steps(), "US", upstream)
+    async_upstream = AsyncFakeUpstream(upstream.statuses, upstream.search)
+    monkeypatch.setattr(async_scraper, "verify_package_status", async_upstream.verify)
+    monkeypatch.setattr(async_scraper, "get_package_by_name", async_upstream.search_by_name)
+    assert asyncio.run(async_scraper.run_steps(make_steps(), "US")) == sync
+    assert async_upstream.calls == upstream.calls
+    return sync
+
+
+@pytest.fixture(autouse=True)
+def no_cache_writes(monkeypatch):
+    monkeypatch.setattr(scraper_logic, "search_hit", lambda pkg, region: (VERIFIED, region))
+
+
+APP = {"name": "Alpha", "package": "com.example.alpha"}
+
+
+def test_verified_guess(monkeypatch):
+    upstream = FakeUpstream({"com.example.alpha": (VERIFIED, "US")})
+    steps = lambda: scraper_logic.verify_or_search_steps(dict(APP), "US")
+    assert run_both(monkeypatch, upstream, steps) == ("com.example.alpha", VERIFIED, "US", "initial_guess")
+
+
+def test_unknown_guess_is_not_searched(monkeypatch):
+    upstream = FakeUpstream({"com.example.alpha": (UNKNOWN, None)})
+    steps = lambda: scraper_logic.verify_or_search_steps(dict(APP), "US")
+    assert run_both(monkeypatch, upstream, steps) == ("com.example.alpha", UNKNOWN, None, "initial_guess")
+    assert upstream.calls == [("verify", "com.example.alpha")]
+
+
+def test_missing_guess_falls_back_to_search(monkeypatch):
+    upstream = FakeUpstream({}, search=["com.example.real"])
+    steps = lambda: scraper_logic.verify_or_search_steps(dict(APP), "US", category="Games")
+    assert run_both(monkeypatch, upstream, steps) == ("com.example.real", VERIFIED, "US", "web_search")
+    assert upstream.calls == [("verify", "com.example.alpha"), ("search", "Alpha (Games)")]
+
+
+def test_nothing_found(monkeypatch):
+    upstream = FakeUpstream({})
+    steps = lambda: scraper_logic.verify_or_search_steps(dict(APP), "US")
+    assert run_both(monkeypatch, upstream, steps) == ("com.example.alpha", NOT_FOUND, None, None)
+
+
+def test_ai_candidate(monkeypatch):
+    upstream = FakeUpstream({"com.example.ai": (VERIFIED, "US")})
+    assert run_both(monkeypatch, upstream, lambda: scraper_logic.ai_candidate_steps(APP, "com.example.ai")) == \
+        ("com.example.ai", VERIFIED, "US")
+    assert run_both(monkeypatch, FakeUpstream({}), lambda: scraper_logic.ai_candidate_steps(APP, None)) == \
+        ("com.example.alpha", NOT_FOUND, None)
@@ -0,0 +1,154 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+# Persistent cache for Play Store existence checks, keyed by (package, region).
+# Backed by SQLite in WAL mode so every uvicorn worker on the host shares the same entries.
+
+VERIFY_CACHE_ENABLED = os.environ.get("VERIFY_CACHE_ENABLED", "1") != "0"
+VERIFY_CACHE_PATH = os.environ.get(
+    "VERIFY_CACHE_PATH", os.path.join(tempfile.gettempdir(), "app_search_verify_cache.sqlite3")
+)
+VERIFY_CACHE_POSITIVE_TTL = float(os.environ.get("VERIFY_CACHE_POSITIVE_TTL", str(24 * 3600)))
+VERIFY_CACHE_NEGATIVE_TTL = float(os.environ.get("VERIFY_CACHE_NEGATIVE_TTL", str(3600)))
+VERIFY_CACHE_MAX_ENTRIES = int(os.environ.get("VERIFY_CACHE_MAX_ENTRIES", "50000"))
+
+# Size is only checked every N writes to keep inserts cheap
+_EVICT_EVERY = 200
+
+_local = threading.local()
+_stats_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "positive_hits": 0, "negative_hits": 0, "writes": 0, "evictions": 0, "errors": 0}
+_writes_since_evict = 0
+
+
+def _connect():
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = sqlite3.connect(VERIFY_CACHE_PATH, timeout=5, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS verify_cache (
+                package TEXT NOT NULL,
+                region TEXT NOT NULL,
+                found INTEGER NOT NULL,
+                checked_at REAL NOT NULL,
+                PRIMARY KEY (package, region)
+            )
+            """
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_verify_cache_checked_at ON verify_cache (checked_at)")
+        _local.conn = conn
+    return conn
+
+
+def _bump(*names):
+    with _stats_lock:
+        for name in names:
+            _stats[name] += 1
+
+
+def get(package_name, region):
+    """
+    Returns True (exists), False (404) or None (miss / expired / cache disabled).
+    """
+    if not VERIFY_CACHE_ENABLED or not package_name:
+        return None
+    try:
+        row = _connect().execute(
+            "SELECT found, checked_at FROM verify_cache WHERE package = ? AND region = ?",
+            (package_name, region),
+        ).fetchone()
+    except sqlite3.Error as e:
+        print(f"Verify Cache Error: {e}")
+        _bump("errors")
+        return None
+
+    if row is not None:
+        found, checked_at = bool(row[0]), row[1]
+        ttl = VERIFY_CACHE_POSITIVE_TTL if found else VERIFY_CACHE_NEGATIVE_TTL
+        if time.time() - checked_at < ttl:
+            _bump("hits", "positive_hits" if found else "negative_hits")
+            return found
+    _bump("misses")
+    return None
+
+
+def put(package_name, region, found):
+    """
+    Stores a definitive result. Only 200 (found=True) and 404 (found=False) should be cached.
+    """
+    global _writes_since_evict
+    if not VERIFY_CACHE_ENABLED or not package_name:
+        return
+    try:
+        conn = _connect()
+        conn.execute(
+            "INSERT OR REPLACE INTO verify_cache (package, region, found, checked_at) VALUES (?, ?, ?, ?)",
+            (package_name, region, 1 if found else 0, time.time()),
+        )
+        _bump("writes")
+        with _stats_lock:
+            _writes_since_evict += 1
+            should_evict = _writes_since_evict >= _EVICT_EVERY
+            if should_evict:
+                _writes_since_evict = 0
+        if should_evict:
+            _evict(conn)
+    except sqlite3.Error as e:
+        print(f"Verify Cache Error: {e}")
+        _bump("errors")
+
+
+def _evict(conn):
+    """
+    Drops expired rows, then the oldest rows beyond VERIFY_CACHE_MAX_ENTRIES.
+    """
+    now = time.time()
+    cur = conn.execute(
+        "DELETE FROM verify_cache WHERE (found = 1 AND checked_at < ?) OR (found = 0 AND checked_at < ?)",
+        (now - VERIFY_CACHE_POSITIVE_TTL, now - VERIFY_CACHE_NEGATIVE_TTL),
+    )
+    removed = cur.rowcount
+    count = conn.execute("SELECT COUNT(*) FROM verify_cache").fetchone()[0]
+    if count > VERIFY_CACHE_MAX_ENTRIES:
+        cur = conn.execute(
+            "DELETE FROM verify_cache WHERE rowid IN (SELECT rowid FROM verify_cache ORDER BY checked_at ASC LIMIT ?)",
+            (count - VERIFY_CACHE_MAX_ENTRIES,),
+        )
+        removed += cur.rowcount
+    if removed:
+        with _stats_lock:
+            _stats["evictions"] += removed
+
+
+def clear():
+    if not VERIFY_CACHE_ENABLED:
+        return
+    try:
+        _connect().execute("DELETE FROM verify_cache")
+    except sqlite3.Error as e:
+        print(f"Verify Cache Error: {e}")
+
+
+def get_stats():
+    """
+    Hit / miss counters for this process plus the shared entry count.
+    """
+    with _stats_lock:
+        stats = dict(_stats)
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_ratio"] = round(stats["hits"] / lookups, 3) if lookups else 0.0
+    stats["enabled"] = VERIFY_CACHE_ENABLED
+    stats["path"] = VERIFY_CACHE_PATH
+    stats["entries"] = None
+    if VERIFY_CACHE_ENABLED:
+        try:
+            stats["entries"] = _connect().execute("SELECT COUNT(*) FROM verify_cache").fetchone()[0]
+        except sqlite3.Error as e:
+            print(f"Verify Cache Error: {e}")
+    return stats